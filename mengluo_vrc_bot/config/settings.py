@@ -0,0 +1,104 @@
+from typing import Dict, Tuple
+
+from nonebot import get_plugin_config
+from pydantic import BaseModel
+
+
+class Config(BaseModel):
+    """梦落 VRC BOT 可调参数，可在 .env 中以同名（大小写不敏感）变量覆盖。"""
+
+    # VRChat API 地址，可指向本地模拟服务器
+    vrc_api_base_url: str = "https://api.vrchat.cloud/api/1/"
+
+    # HTTP 连接池
+    vrc_http_max_connections: int = 100
+    vrc_http_max_keepalive: int = 20
+    vrc_http_keepalive_expiry: float = 30.0
+    vrc_http2: bool = False
+
+    # VRChat API 限流（每个端点分组独立的令牌桶）
+    vrc_rate_limit_rate: float = 2.0  # 每秒补充的令牌数
+    vrc_rate_limit_burst: int = 10  # 桶容量
+    vrc_rate_limit_max_wait: float = 15.0  # 最长排队秒数
+    vrc_rate_limit_families: Dict[str, Tuple[float, int]] = {"auth": (0.5, 3)}
+
+    # VRChat 实体缓存（TTL 单位为秒，0 表示不缓存该类型）
+    vrc_cache_ttl: Dict[str, float] = {
+        "users": 60,
+        "worlds": 3600,
+        "avatars": 3600,
+        "groups": 600,
+        "file": 86400,
+        "instances": 30,
+    }
+    vrc_cache_max_entries: int = 2048
+    vrc_cache_persistent: bool = True
+    vrc_cache_swr: bool = True  # 过期后先返回旧数据并在后台刷新
+    vrc_cache_max_stale: float = 3 * 86400  # 过期后最多还能使用多少秒
+
+    # 404 结果缓存
+    vrc_negative_cache_ttl: float = 300
+    vrc_negative_cache_max_entries: int = 1024
+
+    # 文件元数据（按文件版本永久保存）内存中最多保留的条数
+    vrc_file_meta_max_entries: int = 4096
+
+    # 渲染结果缓存（按模板数据的哈希保存图片，数据不变时不再启动浏览器）
+    vrc_render_cache_enabled: bool = True
+    vrc_render_cache_memory_mb: int = 32  # 内存中最多保存的图片大小
+    vrc_render_cache_disk_mb: int = 256  # data/render_cache 最多占用的空间，0 表示不写磁盘
+
+    # 渲染页面池（常驻页面预先加载样式表，每次只替换卡片内容后截图）
+    vrc_render_pool_size: int = 2  # 页面数，0 表示关闭，每次都用 template_to_pic 新开页面
+    vrc_render_page_max_uses: int = 200  # 每个页面渲染多少次后重建，限制内存占用
+    vrc_render_timeout: float = 30.0  # 等待图片、样式表加载和截图的最长秒数
+
+    # 批量获取实体时的最大并发数
+    vrc_batch_concurrency: int = 8
+
+    # 好友列表分页
+    vrc_friends_concurrency: int = 4  # 每轮并发请求的页数
+    vrc_friends_max: int = 500  # 单次最多查询的好友数
+
+    # 群组成员分页
+    vrc_group_members_concurrency: int = 4  # 每轮并发请求的页数
+    vrc_group_members_max: int = 10000  # 单次最多统计的成员数
+
+    # 好友状态推送（pipeline websocket）
+    vrc_presence_enabled: bool = True  # 关闭后好友查询每次都分页请求API
+    vrc_pipeline_url: str = "wss://pipeline.vrchat.cloud/"
+    vrc_presence_record_file: str = ""  # 非空时把收到的事件追加写入该文件，可供模拟服务器回放
+
+    # 后台预取（绑定用户和近期热门的世界/群组）
+    vrc_prefetch_enabled: bool = True
+    vrc_prefetch_interval: float = 300  # 每种类型最长的检查间隔秒数，TTL更短的类型按TTL检查
+    vrc_prefetch_share: float = 0.2  # 预取最多占用各分组限流速率的比例
+    vrc_prefetch_hot_limit: int = 20  # 每种类型预取访问最频繁的前 N 个
+    vrc_prefetch_half_life: float = 86400  # 访问计数衰减的半衰期（秒）
+
+    # 两步验证
+    # 身份验证器的 base32 密钥，逗号分隔，与 VRC_ACCOUNT 按位置对应；留空的账号私聊超级用户索取验证码
+    vrc_totp_secret: str = ""
+    vrc_two_factor_timeout: float = 300  # 等待超级用户提交验证码的最长秒数
+
+    # 会话保活（定期校验各账号的cookie，过期前提前重新登录）
+    vrc_session_keepalive_enabled: bool = True
+    vrc_session_check_interval: float = 600  # 校验间隔秒数
+    vrc_session_refresh_before: float = 86400  # auth cookie 剩余有效期少于该秒数时提前重新登录
+
+    # 搜索
+    vrc_search_limit: int = 10  # 单次搜索最多返回的条数
+    vrc_search_min_local: int = 3  # 本地索引结果少于该数量时再请求VRChat搜索接口
+
+    # 重试与熔断
+    vrc_retry_attempts: int = 2  # GET 请求失败后的最大重试次数
+    vrc_retry_backoff_base: float = 0.5
+    vrc_retry_backoff_max: float = 5.0
+    vrc_breaker_window: int = 20  # 统计最近多少次调用
+    vrc_breaker_failure_rate: float = 0.5
+    vrc_breaker_min_calls: int = 10
+    vrc_breaker_reset_timeout: float = 30.0
+    vrc_breaker_half_open_max: int = 1
+
+
+settings = get_plugin_config(Config)
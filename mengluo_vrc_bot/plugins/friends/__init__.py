@@ -2,18 +2,32 @@ from nonebot_plugin_alconna import Alconna, Args, UniMessage, on_alconna
 from nonebot_plugin_uninfo import Uninfo
 from nonebot.adapters import Bot
 
+from mengluo_vrc_bot.config.settings import settings
 from mengluo_vrc_bot.utils.rendering import render_friendsinfo
 
 online_friends = on_alconna(Alconna("在线好友", Args["number", int, 50]))
+offline_friends = on_alconna(Alconna("离线好友", Args["number", int, 50]))
 
 @online_friends.handle()
 async def _(bot: Bot, session: Uninfo, number: int):
     if session.user.id in bot.config.superusers:
-        if number > 100:
-            await online_friends.finish("最多只能查询100个好友")
+        if number > settings.vrc_friends_max:
+            await online_friends.finish(f"最多只能查询{settings.vrc_friends_max}个好友")
         img = await render_friendsinfo(False, number)
         if type(img) == str:
             await online_friends.finish(img)
         await UniMessage.image(raw=img).send()
     else:
-        await online_friends.finish("需要登录VRC账号才能使用该功能") # 画饼（bushi
\ No newline at end of file
+        await online_friends.finish("需要登录VRC账号才能使用该功能") # 画饼（bushi
+
+@offline_friends.handle()
+async def _(bot: Bot, session: Uninfo, number: int):
+    if session.user.id in bot.config.superusers:
+        if number > settings.vrc_friends_max:
+            await offline_friends.finish(f"最多只能查询{settings.vrc_friends_max}个好友")
+        img = await render_friendsinfo(True, number)
+        if type(img) == str:
+            await offline_friends.finish(img)
+        await UniMessage.image(raw=img).send()
+    else:
+        await offline_friends.finish("需要登录VRC账号才能使用该功能")
@@ -1,4 +1,37 @@
+import nonebot
+
+from mengluo_vrc_bot.config.settings import settings
 from mengluo_vrc_bot.services.db import init_db  # 导入初始化数据库的函数
+from mengluo_vrc_bot.services.prefetch import prefetcher
+from mengluo_vrc_bot.services.presence import subscriber
+from mengluo_vrc_bot.services.session_keeper import keeper
+from mengluo_vrc_bot.utils.http_utils import AsyncHttpx
+from mengluo_vrc_bot.utils.rendering import render_engine
+from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPI
 import mengluo_vrc_bot.config.path
 
-init_db()
\ No newline at end of file
+init_db()
+
+driver = nonebot.get_driver()
+
+
+@driver.on_startup
+async def _():
+    await AsyncHttpx.startup()
+    await render_engine.warm()
+    await VRChatAPI.prune_cache()
+    if settings.vrc_session_keepalive_enabled:
+        keeper.start()
+    if settings.vrc_presence_enabled:
+        subscriber.start()
+    if settings.vrc_prefetch_enabled:
+        prefetcher.start()
+
+
+@driver.on_shutdown
+async def _():
+    await prefetcher.stop()
+    await subscriber.stop()
+    await keeper.stop()
+    await render_engine.close()
+    await AsyncHttpx.shutdown()
@@ -0,0 +1,56 @@
+import nonebot
+from nonebot.adapters import Bot
+from nonebot.permission import SUPERUSER
+from nonebot.plugin import PluginMetadata
+from nonebot_plugin_alconna import Alconna, Args, Target, UniMessage, on_alconna
+from nonebot_plugin_uninfo import Uninfo
+
+from mengluo_vrc_bot.services.account_refresh import two_factor
+from mengluo_vrc_bot.services.log import logger
+
+__plugin_meta__ = PluginMetadata(
+    name="两步验证",
+    description="提交VRChat登录所需的两步验证码（仅超级用户）",
+    usage="""
+    两步验证：机器人登录VRChat需要验证码时会私聊通知超级用户，请私聊发送“两步验证 验证码”
+    """,
+)
+
+submit_code = on_alconna(
+    Alconna("两步验证", Args["code", str]), permission=SUPERUSER, priority=5, block=True
+)
+
+
+@submit_code.handle()
+async def _(session: Uninfo, code: str):
+    # 恢复码等验证码不能发在群里，只接受私聊
+    if not session.scene.is_private:
+        await submit_code.finish("请私聊发送验证码，已发出的验证码请尽快撤回")
+    if two_factor.submit(code):
+        await submit_code.finish("验证码已提交")
+    await submit_code.finish("当前没有等待中的两步验证")
+
+
+driver = nonebot.get_driver()
+
+
+async def notify_superusers(bot: Bot, message: str):
+    for user_id in bot.config.superusers:
+        try:
+            await UniMessage.text(message).send(target=Target(user_id, private=True), bot=bot)
+        except Exception as e:
+            logger.error(f"通知超级用户{user_id}失败: {e}")
+
+
+@two_factor.add_notifier
+async def _(message: str):
+    for bot in nonebot.get_bots().values():
+        await notify_superusers(bot, message)
+
+
+@driver.on_bot_connect
+async def _(bot: Bot):
+    # 启动时的登录早于机器人连接，当时的提示没有发出去，连接后补发
+    message = two_factor.message
+    if two_factor.pending and message:
+        await notify_superusers(bot, message)
@@ -1,8 +1,9 @@
-from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPI
+from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPI, VRChatAPIError
 
 async def get_user_name(user_id):
-    user_info = await VRChatAPI().get_user(user_id)
-    if user_info:
-        return user_info.get("displayName")
-    else:
-        return None
\ No newline at end of file
+    # 失败时（如未找到资源）返回None，重复的无效ID会命中404结果缓存
+    try:
+        user_info = await VRChatAPI().get_user(user_id)
+    except VRChatAPIError:
+        return None
+    return user_info.display_name
\ No newline at end of file
@@ -6,12 +6,15 @@ from nonebot.plugin import PluginMetadata
 from mengluo_vrc_bot.services.db import fetchone
 
 from mengluo_vrc_bot.utils.rendering import *
+from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPIError
 
 AVATAR_ID_PATTERN = re.compile(r'^avtr_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
 WORLD_ID_PATTERN = re.compile(r'^wrld_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
 USER_ID_PATTERN = re.compile(r'^usr_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
 GROUP_ID_PATTERN = re.compile(r'^grp_[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$')
 
+SEARCH_LABELS = {"users": "用户", "worlds": "世界", "groups": "群组"}
+
 __plugin_meta__ = PluginMetadata(
     name="信息获取",
     description="获取Vrchat信息",
@@ -21,6 +24,8 @@ __plugin_meta__ = PluginMetadata(
     查看用户：查看用户信息，格式为usr_前缀+UUID，支持@用户
     我的vrc：查看当前绑定的VRC用户信息
     查看群组：查看群组信息，格式为grp_前缀+UUID
+    群组成员：统计群组成员的信任等级、加入时间和身份组，格式为grp_前缀+UUID
+    搜索用户/搜索世界/搜索群组：按名称搜索，支持部分匹配，世界也可按作者名搜索，群组也可按短代码搜索
     """,
 )
 
@@ -29,6 +34,7 @@ get_world = on_alconna(Alconna("查看世界", Args["id", str]), priority=5, blo
 get_user = on_alconna(Alconna("查看用户", Args["id?", str, None]["at_user?", At]), priority=5, block=True)
 my_info= on_alconna(Alconna("我的vrc"), aliases={"我的VRC"}, priority=5, block=True)
 get_group = on_alconna(Alconna("查看群组", Args["id", str]), priority=5, block=True)
+group_members = on_alconna(Alconna("群组成员", Args["id", str]), priority=5, block=True)
 search_group = on_alconna(Alconna("搜索群组", Args["name", str]), priority=5, block=True)
 search_user = on_alconna(Alconna("搜索用户", Args["name", str]), priority=5, block=True)
 search_world = on_alconna(Alconna("搜索世界", Args["name", str]), priority=5, block=True)
@@ -96,16 +102,47 @@ async def _(id: str):
     await UniMessage.image(raw=img).send()
 
 
+@group_members.handle()
+async def _(id: str):
+    # 验证群组ID格式（grp_前缀+UUID）
+    if not GROUP_ID_PATTERN.match(id):
+        await group_members.finish("错误：群组ID格式不正确")
+    img = await render_group_members(id)
+    if type(img) == str:
+        await group_members.finish(img)
+    await UniMessage.image(raw=img).send()
+
+
+async def search_entities(kind: str, name: str) -> str:
+    """搜索实体并整理为文本"""
+    label = SEARCH_LABELS[kind]
+    try:
+        hits = await vrchat.search(kind, name)
+    except VRChatAPIError as e:
+        return str(e)
+    if not hits:
+        return f"未找到相关{label}：{name}"
+
+    lines = [f"找到 {len(hits)} 个相关{label}："]
+    for index, hit in enumerate(hits, 1):
+        detail = f"（作者：{hit.author}）" if hit.author else ""
+        if hit.code:
+            detail += f"（{hit.code}）"
+        lines.append(f"{index}. {hit.name}{detail}\n   {hit.id}")
+    lines.append(f"发送「查看{label} ID」查看详情")
+    return "\n".join(lines)
+
+
 @search_group.handle()
 async def _(name: str):
-    await search_group.finish(f"你搜索的群组ID是: {name}")
+    await search_group.finish(await search_entities("groups", name))
 
 
 @search_user.handle()
 async def _(name: str):
-    await search_user.finish(f"你搜索的用户ID是: {name}")
+    await search_user.finish(await search_entities("users", name))
 
 
 @search_world.handle()
 async def _(name: str):
-    await search_world.finish(f"你搜索的世界ID是: {name}")
+    await search_world.finish(await search_entities("worlds", name))
@@ -1,18 +1,38 @@
+import asyncio
+import base64
+import binascii
+import hashlib
+import hmac
+import os
+import struct
+import time
 import ujson
-from typing import Dict, Optional
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from http.cookies import CookieError, SimpleCookie
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, Union
 
 import nonebot
 from mengluo_vrc_bot.utils.http_utils import AsyncHttpx
 from mengluo_vrc_bot.services.log import logger
 from mengluo_vrc_bot.config.path import DATA_PATH
+from mengluo_vrc_bot.config.settings import settings
 
 config = nonebot.get_driver().config
-account_info = config.vrc_account
 
 # 常量定义
-VRC_API_BASE = "https://api.vrchat.cloud/api/1"
+VRC_API_BASE = settings.vrc_api_base_url.rstrip("/")
 USER_AGENT = "mengluo_vrc_bot/1.0"
 COOKIE_FILE = DATA_PATH / "cookie.json"
+AUTH_RETRY_DELAY = 300.0  # 认证失败的账号多久后重新尝试
+EXPIRES_KEY = "_expires_at"  # cookie文件中记录auth cookie过期时间的键，不会作为cookie发送
+TWO_FACTOR_ATTEMPTS = 3  # 单次登录最多尝试的验证码个数
+TWO_FACTOR_ENDPOINTS = {
+    "totp": "auth/twofactorauth/totp/verify",
+    "otp": "auth/twofactorauth/otp/verify",  # 恢复码
+    "emailOtp": "auth/twofactorauth/emailotp/verify",
+}
 
 
 class VRCAuthError(Exception):
@@ -20,6 +40,11 @@ class VRCAuthError(Exception):
     pass
 
 
+class VRCLoginPendingError(VRCAuthError):
+    """账号正在登录（可能在等待两步验证码），等待超时"""
+    pass
+
+
 def _parse_cookies(set_cookie_header: str) -> Dict[str, str]:
     """解析Set-Cookie头部"""
     cookies_dict = {}
@@ -37,11 +62,137 @@ def _parse_cookies(set_cookie_header: str) -> Dict[str, str]:
     return cookies_dict
 
 
-async def refresh_token() -> Optional[Dict[str, str]]:
-    """刷新令牌获取新的cookies"""
+def _parse_cookie_expiry(set_cookie_headers: List[str]) -> Optional[float]:
+    """从Set-Cookie头部中取出auth cookie的过期时间（time.time()），未声明时返回None"""
+    for header in set_cookie_headers:
+        cookie = SimpleCookie()
+        try:
+            cookie.load(header)
+        except CookieError:
+            continue
+        morsel = cookie.get('auth')
+        if morsel is None:
+            continue
+        try:
+            if morsel['max-age']:
+                return time.time() + int(morsel['max-age'])
+            if morsel['expires']:
+                return parsedate_to_datetime(morsel['expires']).timestamp()
+        except (TypeError, ValueError):
+            logger.warning(f"无法解析auth cookie的过期时间: {header}")
+    return None
+
+
+def generate_totp(secret: str, at: Optional[float] = None, digits: int = 6, period: int = 30) -> str:
+    """
+    按 RFC 6238 由 base32 密钥生成 TOTP 验证码
+
+    Raises:
+        binascii.Error: 密钥不是合法的 base32
+    """
+    secret = secret.replace(" ", "").upper()
+    key = base64.b32decode(secret + "=" * (-len(secret) % 8))
+    counter = int((time.time() if at is None else at) // period)
+    digest = hmac.new(key, struct.pack(">Q", counter), hashlib.sha1).digest()
+    offset = digest[-1] & 0x0F
+    code = struct.unpack(">I", digest[offset:offset + 4])[0] & 0x7FFFFFFF
+    return str(code % 10 ** digits).zfill(digits)
+
+
+class TwoFactorPrompt:
+    """
+    向管理员索取两步验证码
+
+    说明:
+        需要验证码时调用已注册的通知函数（如私聊超级用户），然后异步等待 submit() 提交，
+        等待期间事件循环照常运行。同一时刻只等待一个验证码，多个账号需要验证时依次进行。
+        启动时登录可能早于机器人连接，等待中的提示保存在 message 中，供连接后补发。
+    """
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._future: Optional[asyncio.Future] = None
+        self._notifiers: List[Callable[[str], Awaitable[None]]] = []
+        self.message: Optional[str] = None  # 等待中的提示
+
+    @property
+    def pending(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def add_notifier(self, notifier: Callable[[str], Awaitable[None]]) -> Callable[[str], Awaitable[None]]:
+        """注册通知函数，可作为装饰器使用"""
+        self._notifiers.append(notifier)
+        return notifier
+
+    async def notify(self, message: str):
+        for notifier in self._notifiers:
+            try:
+                await notifier(message)
+            except Exception as e:
+                logger.error(f"发送两步验证通知失败: {e}")
+
+    async def wait(self, message: str, timeout: float) -> Optional[str]:
+        """
+        通知管理员并等待验证码
+
+        Returns:
+            提交的验证码，超时返回 None
+        """
+        async with self._lock:
+            self._future = asyncio.get_running_loop().create_future()
+            self.message = message
+            logger.warning(message)
+            await self.notify(message)
+            try:
+                return await asyncio.wait_for(self._future, timeout)
+            except asyncio.TimeoutError:
+                logger.error("等待两步验证码超时")
+                return None
+            finally:
+                self._future = None
+                self.message = None
+
+    def submit(self, code: str) -> bool:
+        """提交验证码，当前没有等待中的验证时返回 False"""
+        if not self.pending:
+            return False
+        self._future.set_result(code.strip())
+        return True
+
+
+two_factor = TwoFactorPrompt()
+
+
+def parse_accounts(value: Union[str, List[str], None]) -> List[str]:
+    """解析 VRC_ACCOUNT，支持单个账号、逗号分隔的多个账号或 JSON 列表"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [account.strip() for account in value if account and account.strip()]
+
+
+def parse_totp_secrets(value: Optional[str]) -> List[str]:
+    """解析 VRC_TOTP_SECRET，逗号分隔，与 VRC_ACCOUNT 按位置对应，留空表示该账号不自动生成验证码"""
+    if not value:
+        return []
+    return [secret.strip() for secret in value.split(",")]
+
+
+def cookie_file_for(index: int, account: str) -> Path:
+    """第一个账号沿用 cookie.json，其余账号按凭据的哈希区分，调整顺序后仍能对应"""
+    if index == 0:
+        return COOKIE_FILE
+    return DATA_PATH / f"cookie_{hashlib.sha1(account.encode()).hexdigest()[:8]}.json"
+
+
+async def refresh_token(
+    account: str, totp_secret: str = "", name: str = ""
+) -> Optional[Tuple[Dict[str, str], Optional[float]]]:
+    """刷新令牌获取新的cookies，返回 (cookies, auth cookie过期时间)；totp_secret、name 用于两步验证"""
     url = f"{VRC_API_BASE}/auth/user"
     headers = {
-        "Authorization": f"Basic {account_info}",
+        "Authorization": f"Basic {account}",
         "User-Agent": USER_AGENT
     }
     
@@ -59,8 +210,8 @@ async def refresh_token() -> Optional[Dict[str, str]]:
             return None
         
         # 验证cookie是否有效
-        if await test_cookie(f"auth={cookies_dict['auth']}"):
-            return cookies_dict
+        if await test_cookie(f"auth={cookies_dict['auth']}", totp_secret, name):
+            return cookies_dict, _parse_cookie_expiry(response.headers.get_list('Set-Cookie'))
         else:
             logger.error("获取的cookie无效")
             return None
@@ -70,51 +221,304 @@ async def refresh_token() -> Optional[Dict[str, str]]:
         return None
 
 
-async def update_cookie() -> str:
-    """更新并保存cookie"""
-    cookies_dict = await refresh_token()
-    if not cookies_dict:
-        raise VRCAuthError("无法获取有效的Cookie")
-    
-    try:
-        # 保存cookie到文件u
-        with open(COOKIE_FILE, "w", encoding='utf-8') as f:
-            ujson.dump(cookies_dict, f, indent=2, ensure_ascii=False)
-        
-        logger.info("Cookie已成功更新")
+class AccountSession:
+    """
+    单个账号的登录会话
+
+    说明:
+        每个账号使用独立的cookie文件和健康状态。
+        被限流（429）或认证失败（401）时暂时移出轮换，
+        分别在 Retry-After 到期、重新登录成功（或 AUTH_RETRY_DELAY 之后）回到轮换。
+        cookie 读取一次后保存在内存中；读取文件和重新登录都在锁内进行，
+        同一时刻最多只有一次登录，写文件先写临时文件再替换，并在线程池中执行。
+        登录可能因等待两步验证码持续数分钟，用户请求可以通过 wait 限制等待锁的时间，超时抛出 VRCLoginPendingError。
+        auth cookie 的过期时间随cookie一起保存，供后台保活提前刷新；
+        最近一次校验的结果（healthy、checked_at）通过 stats() 对外提供。
+    """
+
+    def __init__(self, name: str, account: str, cookie_file: Path, totp_secret: str = ""):
+        self.name = name
+        self.account = account
+        self.totp_secret = totp_secret
+        self.cookie_file = cookie_file
+        self.throttled_until = 0.0  # time.monotonic()
+        self.last_throttled = 0.0
+        self.unauthorized_until = 0.0
+        self.throttles = 0
+        self.auth_failures = 0
+        self.logins = 0
+        self.expires_at: Optional[float] = None  # time.time()，未知时为None
+        self.checked_at: Optional[float] = None
+        self.healthy: Optional[bool] = None  # 最近一次校验结果，None 表示未校验或无法判断
+        self._cookie: Optional[Dict[str, str]] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def available(self) -> bool:
+        now = time.monotonic()
+        return now >= self.throttled_until and now >= self.unauthorized_until
+
+    @property
+    def authorized(self) -> bool:
+        return time.monotonic() >= self.unauthorized_until
+
+    def mark_throttled(self, seconds: float):
+        """收到 429，在 seconds 秒内不再使用"""
+        now = time.monotonic()
+        self.throttled_until = max(self.throttled_until, now + seconds)
+        self.last_throttled = now
+        self.throttles += 1
+
+    def expires_within(self, seconds: float) -> bool:
+        """auth cookie是否会在 seconds 秒内过期，过期时间未知时返回False"""
+        return self.expires_at is not None and self.expires_at - time.time() < seconds
+
+    def _read(self) -> Optional[Dict[str, str]]:
+        try:
+            with open(self.cookie_file, "r", encoding='utf-8') as f:
+                auth_data = ujson.load(f)
+        except FileNotFoundError:
+            logger.info(f"账号{self.name}的Cookie文件不存在，开始创建")
+            return None
+        except (IOError, ValueError) as e:
+            logger.error(f"读取cookie文件失败: {e}")
+            return None
+        if not isinstance(auth_data, dict) or 'auth' not in auth_data:
+            logger.warning("Cookie文件格式错误，重新获取")
+            return None
+        expires_at = auth_data.pop(EXPIRES_KEY, None)
+        self.expires_at = float(expires_at) if isinstance(expires_at, (int, float)) else None
+        return auth_data
+
+    def _write(self, cookies_dict: Dict[str, str], expires_at: Optional[float]):
+        data = dict(cookies_dict)
+        if expires_at is not None:
+            data[EXPIRES_KEY] = expires_at
+        tmp_file = self.cookie_file.with_name(f"{self.cookie_file.name}.tmp")
+        with open(tmp_file, "w", encoding='utf-8') as f:
+            ujson.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_file, self.cookie_file)
+
+    @asynccontextmanager
+    async def _locked(self, wait: Optional[float] = None) -> AsyncIterator[None]:
+        """
+        获取会话锁
+
+        Args:
+            wait: 最长等待秒数，None 表示不限
+
+        Raises:
+            VRCLoginPendingError: 等待超过 wait 秒
+        """
+        acquire = asyncio.ensure_future(self._lock.acquire())
+        try:
+            await asyncio.wait({acquire}, timeout=wait)
+        except BaseException:
+            if acquire.done() and not acquire.cancelled():
+                self._lock.release()
+            acquire.cancel()
+            raise
+        if not acquire.done():
+            # 取消后 Lock 会把锁交给下一个等待者，不会泄漏
+            acquire.cancel()
+            raise VRCLoginPendingError(f"账号{self.name}正在登录，请稍后再试")
+        try:
+            yield
+        finally:
+            self._lock.release()
+
+    async def _login(self, background: bool = False) -> Dict[str, str]:
+        """
+        登录并保存cookie，调用方需持有锁
+
+        Args:
+            background: 提前刷新时为True，旧cookie仍然有效，登录期间及失败后账号都留在轮换中；
+                否则登录期间及失败后账号不在轮换中
+        """
+        if not background:
+            self.unauthorized_until = time.monotonic() + AUTH_RETRY_DELAY
+        self.logins += 1
+        result = await refresh_token(self.account, self.totp_secret, self.name)
+        if not result:
+            self.auth_failures += 1
+            if not background:
+                # 两步验证可能等待较久，从失败时重新计算
+                self.unauthorized_until = time.monotonic() + AUTH_RETRY_DELAY
+            raise VRCAuthError(f"账号{self.name}无法获取有效的Cookie")
+
+        cookies_dict, expires_at = result
+        self._cookie = cookies_dict
+        self.expires_at = expires_at
+        self.unauthorized_until = 0.0
+        self.checked_at = time.time()
+        self.healthy = True
+        try:
+            await asyncio.to_thread(self._write, cookies_dict, expires_at)
+        except OSError as e:
+            # 内存中的cookie仍然可用，下次登录时再尝试保存
+            logger.error(f"保存cookie文件失败: {e}")
+        logger.info(f"账号{self.name}的Cookie已成功更新")
         return cookies_dict
-        
-    except IOError as e:
-        logger.error(f"保存cookie文件失败: {e}")
-        raise VRCAuthError(f"保存cookie文件失败: {e}")
 
+    async def update_cookie(
+        self, stale: Optional[Dict[str, str]] = None, wait: Optional[float] = None
+    ) -> Dict[str, str]:
+        """
+        重新登录并保存cookie，成功后回到轮换
 
-async def get_cookie() -> str:
-    """获取cookie，如果不存在则自动更新"""
-    try:
-        if not COOKIE_FILE.exists():
-            logger.info("Cookie文件不存在，开始创建")
-            return await update_cookie()
-        
-        with open(COOKIE_FILE, "r", encoding='utf-8') as f:
-            auth_data = ujson.load(f)
-            if not isinstance(auth_data, dict) or 'auth' not in auth_data:
-                logger.warning("Cookie文件格式错误，重新获取")
-                return await update_cookie()
-            else:
-                return auth_data
-
-    except (IOError, ujson.JSONDecodeError) as e:
-        logger.error(f"读取cookie文件失败: {e}")
-        # 文件损坏时重新获取
-        await update_cookie()
-        with open(COOKIE_FILE, "r", encoding='utf-8') as f:
-            auth_data = ujson.load(f)
-        return f"auth={auth_data['auth']}"
+        Args:
+            stale: 收到 401 的请求所使用的cookie；若在等待锁期间已被其他请求换成新的，
+                直接返回新cookie，不再重复登录
+            wait: 其他请求正在登录时最长等待秒数，None 表示不限
+
+        Raises:
+            VRCLoginPendingError: 等待其他请求登录超过 wait 秒
+            VRCAuthError: 登录失败，或距上次登录失败不到 AUTH_RETRY_DELAY
+        """
+        async with self._locked(wait):
+            if stale is not None and self._cookie is not None and self._cookie is not stale:
+                return self._cookie
+            if stale is not None and not self.authorized:
+                raise VRCAuthError(f"账号{self.name}登录失败，稍后再试")
+            self._cookie = None
+            return await self._login()
+
+    async def get_cookie(self, wait: Optional[float] = None) -> Dict[str, str]:
+        """
+        获取cookie，内存中没有时读取文件，文件不存在或损坏时自动登录
+
+        Args:
+            wait: 其他请求正在登录时最长等待秒数，None 表示不限
+
+        Raises:
+            VRCLoginPendingError: 等待其他请求登录超过 wait 秒
+            VRCAuthError: 登录失败
+        """
+        cookie = self._cookie
+        if cookie is not None:
+            return cookie
+        async with self._locked(wait):
+            if self._cookie is None:
+                self._cookie = await asyncio.to_thread(self._read)
+            if self._cookie is None:
+                return await self._login()
+            return self._cookie
+
+    async def refresh(self) -> Dict[str, str]:
+        """
+        在cookie过期前重新登录
+
+        说明:
+            不清空内存中的旧cookie，登录期间其他请求继续使用旧cookie，新cookie就绪后再替换。
+
+        Raises:
+            VRCAuthError: 登录失败
+        """
+        async with self._lock:
+            return await self._login(background=True)
+
+    async def check(self) -> Optional[bool]:
+        """
+        校验当前cookie并记录健康状态，已失效时立即重新登录
+
+        Returns:
+            校验结果，None 表示请求失败无法判断
+
+        Raises:
+            VRCAuthError: 需要登录但登录失败
+        """
+        cookie = await self.get_cookie()
+        valid = await verify_cookie(cookie)
+        self.checked_at = time.time()
+        self.healthy = valid
+        if valid is False:
+            logger.warning(f"账号{self.name}的Cookie已失效，重新登录")
+            await self.update_cookie(stale=cookie)
+        return valid
+
+    def stats(self) -> Dict[str, object]:
+        now = time.monotonic()
+        return {
+            "available": self.available,
+            "healthy": self.healthy,
+            "checked_ago": None if self.checked_at is None else round(time.time() - self.checked_at, 1),
+            "expires_in": None if self.expires_at is None else round(self.expires_at - time.time(), 1),
+            "throttled_for": round(max(self.throttled_until - now, 0.0), 1),
+            "unauthorized_for": round(max(self.unauthorized_until - now, 0.0), 1),
+            "throttles": self.throttles,
+            "auth_failures": self.auth_failures,
+            "logins": self.logins,
+        }
+
+
+class SessionPool:
+    """
+    多账号会话池
+
+    说明:
+        VRC_ACCOUNT 配置了多个账号时，请求分散到各账号上，总吞吐量随账号数增加。
+        第一个账号为主账号，pipeline 订阅等只需一个会话的功能使用主账号。
+    """
+
+    def __init__(self, accounts: List[str], totp_secrets: Optional[List[str]] = None):
+        accounts = accounts or [""]
+        totp_secrets = totp_secrets or []
+        self.sessions = [
+            AccountSession(
+                f"#{index + 1}",
+                account,
+                cookie_file_for(index, account),
+                totp_secrets[index] if index < len(totp_secrets) else "",
+            )
+            for index, account in enumerate(accounts)
+        ]
+
+    @property
+    def primary(self) -> AccountSession:
+        return self.sessions[0]
+
+    def pick(self, tokens: Optional[Callable[[AccountSession], float]] = None) -> AccountSession:
+        """
+        选择本次请求使用的会话
+
+        说明:
+            在轮换中的会话里，优先选有令牌可用的，其次选最久没有被限流的，再选令牌最多的；
+            全部不在轮换中时，选限流最早结束的已登录会话，都未登录时使用主账号。
+
+        Args:
+            tokens: 返回会话当前可用令牌数的函数，用于在各账号之间分摊请求
+        """
+        tokens = tokens or (lambda session: 0.0)
+        candidates = [session for session in self.sessions if session.available]
+        if candidates:
+            return max(
+                candidates,
+                key=lambda session: (tokens(session) >= 1, -session.last_throttled, tokens(session)),
+            )
+        authorized = [session for session in self.sessions if session.authorized]
+        if authorized:
+            return min(authorized, key=lambda session: session.throttled_until)
+        return self.primary
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {session.name: session.stats() for session in self.sessions}
+
+
+pool = SessionPool(parse_accounts(config.vrc_account), parse_totp_secrets(settings.vrc_totp_secret))
+
+
+async def update_cookie() -> Dict[str, str]:
+    """更新并保存主账号的cookie"""
+    return await pool.primary.update_cookie()
+
+
+async def get_cookie() -> Dict[str, str]:
+    """获取主账号的cookie，如果不存在则自动更新"""
+    return await pool.primary.get_cookie()
 
 
-async def test_cookie(cookie: str) -> bool:
-    """测试cookie是否有效"""
+async def test_cookie(cookie: str, totp_secret: str = "", name: str = "") -> bool:
+    """测试cookie是否有效，需要两步验证时使用 totp_secret 或向超级用户索取验证码"""
     url = f"{VRC_API_BASE}/auth/user"
     headers = {
         "User-Agent": USER_AGENT
@@ -139,7 +543,9 @@ async def test_cookie(cookie: str) -> bool:
         
         # 需要两步验证
         if response_data.get("requiresTwoFactorAuth"):
-            return await handle_two_factor_auth(cookie)
+            return await handle_two_factor_auth(
+                cookie, response_data["requiresTwoFactorAuth"], totp_secret, name
+            )
         
         # 检查是否有有效的用户信息
         if response_data.get("id"):
@@ -154,45 +560,116 @@ async def test_cookie(cookie: str) -> bool:
         return False
 
 
-async def handle_two_factor_auth(cookie: str) -> bool:
-    """处理两步验证"""
-    url = f"{VRC_API_BASE}/auth/twofactorauth/totp/verify"
+async def verify_cookie(cookie: Dict[str, str]) -> Optional[bool]:
+    """
+    用 GET auth 轻量校验cookie，不拉取用户资料
+
+    Returns:
+        True 有效，False 已失效，None 请求失败无法判断
+    """
+    url = f"{VRC_API_BASE}/auth"
     headers = {
         "User-Agent": USER_AGENT
     }
 
-    while True:
+    try:
+        response = await AsyncHttpx.get(url, headers=headers, cookies=cookie)
+        if response.status_code == 401:
+            return False
+        if response.status_code != 200:
+            logger.warning(f"校验cookie失败，状态码: {response.status_code}")
+            return None
+        return bool(ujson.loads(response.content).get("ok"))
+    except Exception as e:
+        logger.warning(f"校验cookie时出错: {e}")
+        return None
+
+
+async def handle_two_factor_auth(
+    cookie: str, methods: Optional[List[str]] = None, totp_secret: str = "", name: str = ""
+) -> bool:
+    """
+    处理两步验证
+
+    说明:
+        账号配置了 TOTP 密钥（VRC_TOTP_SECRET 中对应的位置）且支持 totp 时自动生成验证码；
+        否则通过 two_factor 通知超级用户，等待其用“两步验证”命令提交验证码，
+        等待期间不阻塞事件循环，超过 VRC_TWO_FACTOR_TIMEOUT 秒未提交视为登录失败。
+        只有向超级用户索取过验证码时才通知验证结果，自动生成验证码的重新登录不打扰超级用户。
+
+    Args:
+        cookie: 待验证的cookie字符串
+        methods: VRChat 返回的 requiresTwoFactorAuth，如 ["totp", "otp"] 或 ["emailOtp"]
+        totp_secret: 该账号身份验证器的 base32 密钥
+        name: 账号名称，用于提示超级用户是哪个账号
+    """
+    methods = methods if isinstance(methods, list) else ["totp", "otp"]
+    headers = {
+        "User-Agent": USER_AGENT
+    }
+
+    # 解析cookie字符串为字典格式
+    cookie_dict = {}
+    if cookie:
+        for item in cookie.split(';'):
+            if '=' in item:
+                key, value = item.strip().split('=', 1)
+                cookie_dict[key] = value
+
+    use_secret = bool(totp_secret) and "totp" in methods
+    message = (
+        f"VRChat账号{name}登录需要两步验证（{'/'.join(methods)}），"
+        f"请在{int(settings.vrc_two_factor_timeout)}秒内私聊发送：两步验证 验证码"
+    )
+    prompted = False
+    for _ in range(TWO_FACTOR_ATTEMPTS):
+        code = None
+        if use_secret:
+            try:
+                code = generate_totp(totp_secret)
+            except (binascii.Error, ValueError) as e:
+                logger.error(f"账号{name}的 TOTP 密钥无效: {e}")
+            use_secret = False
+        if code is None:
+            prompted = True
+            code = await two_factor.wait(message, settings.vrc_two_factor_timeout)
+            if code is None:
+                return False
+        if not code:
+            logger.warning("验证码不能为空")
+            continue
+
+        if "emailOtp" in methods:
+            method = "emailOtp"
+        elif "totp" in methods and len(code) == 6 and code.isdigit():
+            method = "totp"
+        else:
+            method = "otp"
+
         try:
-            # 注意：在生产环境中，应该通过更安全的方式获取验证码
-            # 比如通过配置文件、环境变量或外部接口
-            print(f"请输入两步验证码: ", end="")
-            code = input().strip()
-            
-            if not code:
-                logger.warning("验证码不能为空")
-                continue
-            
-            # 解析cookie字符串为字典格式
-            cookie_dict = {}
-            if cookie:
-                for item in cookie.split(';'):
-                    if '=' in item:
-                        key, value = item.strip().split('=', 1)
-                        cookie_dict[key] = value
-            
-            data = {"code": code}
-            response = await AsyncHttpx.post(url, headers=headers, cookies=cookie_dict, json=data)
-            
-            if response.status_code == 200:
-                logger.info("两步验证成功")
-                return True
-            elif response.status_code == 401:
-                logger.error("验证码错误")
-            else:
-                logger.error(f"未知错误，状态码: {response.status_code}")
-                
+            response = await AsyncHttpx.post(
+                f"{VRC_API_BASE}/{TWO_FACTOR_ENDPOINTS[method]}",
+                headers=headers, cookies=cookie_dict, json={"code": code},
+            )
         except Exception as e:
             logger.error(f"两步验证时出错: {e}")
+            continue
+
+        if response.status_code == 200:
+            logger.info("两步验证成功")
+            if prompted:
+                await two_factor.notify("两步验证成功")
+            return True
+        elif response.status_code in (400, 401):
+            logger.error("验证码错误")
+            message = f"账号{name}的验证码错误，请重新发送：两步验证 验证码"
+        else:
+            logger.error(f"未知错误，状态码: {response.status_code}")
+            message = f"账号{name}两步验证失败（状态码 {response.status_code}），请重新发送：两步验证 验证码"
+
+    if prompted:
+        await two_factor.notify("两步验证失败次数过多，本次登录失败")
+    return False
 
 
 async def ensure_valid_cookie() -> str:
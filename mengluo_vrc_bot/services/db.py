@@ -54,4 +54,21 @@ async def fetchone(sql, *args):
         return None
     finally:
         if conn:
-            conn.close()
\ No newline at end of file
+            conn.close()
+
+async def fetchall(sql, *args):
+    """执行读操作，返回全部结果"""
+    conn = None
+    try:
+        conn = await get_db()
+        c = conn.cursor()
+        c.execute(sql, args)
+        result = c.fetchall()
+        c.close()
+        return result
+    except Exception as e:
+        logger.error(f"执行SQL语句时发生错误: {e}")
+        return []
+    finally:
+        if conn:
+            conn.close()
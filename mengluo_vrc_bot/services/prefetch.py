@@ -0,0 +1,152 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set
+
+from mengluo_vrc_bot.config.settings import settings
+from mengluo_vrc_bot.services.db import fetchall
+from mengluo_vrc_bot.services.log import logger
+from mengluo_vrc_bot.utils.cache import cache_kind
+from mengluo_vrc_bot.utils.rate_limit import RateLimiter
+from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPI, VRChatAPIError
+
+START_DELAY = 30.0  # 启动后等待多久开始第一轮，避开启动时的全量同步
+HEADROOM_POLL = 1.0  # 限流余量不足时的重新检查间隔
+HOT_KINDS = ("worlds", "groups")
+PREFETCH_KINDS = ("users", "worlds", "groups")
+
+
+class Prefetcher:
+    """
+    后台预取
+
+    说明:
+        定期把绑定用户的资料、以及近期访问最频繁的世界和群组刷新到实体缓存，
+        每种类型按 min(缓存TTL, interval) 秒的周期检查，只处理缓存中缺失或将在该类型下一次检查之前过期的端点，
+        因此TTL短于 interval 的类型（默认配置下的 users）也能保持缓存新鲜；TTL为0（不缓存）的类型不预取。
+        预取使用单独的令牌桶，速率为各分组限流速率的 share 倍；
+        并且只在主限流器剩余令牌不少于桶容量的 (1 - share) 时发出请求，给用户请求让路。
+
+    Args:
+        api: 使用的API实例，默认新建
+        interval: 每种类型的最长检查间隔秒数，默认使用配置项 VRC_PREFETCH_INTERVAL
+        share: 最多占用的限流速率比例，默认使用配置项 VRC_PREFETCH_SHARE
+        hot_limit: 每种类型预取的热门实体数，默认使用配置项 VRC_PREFETCH_HOT_LIMIT
+    """
+
+    def __init__(
+        self,
+        api: Optional[VRChatAPI] = None,
+        interval: Optional[float] = None,
+        share: Optional[float] = None,
+        hot_limit: Optional[int] = None,
+    ):
+        self.api = api or VRChatAPI()
+        self.interval = interval or settings.vrc_prefetch_interval
+        self.share = min(max(share if share is not None else settings.vrc_prefetch_share, 0.01), 1.0)
+        self.hot_limit = hot_limit if hot_limit is not None else settings.vrc_prefetch_hot_limit
+        self._budget = RateLimiter(
+            settings.vrc_rate_limit_rate * self.share,
+            1,
+            overrides={
+                family: (rate * self.share, 1)
+                for family, (rate, _) in settings.vrc_rate_limit_families.items()
+            },
+        )
+        self.cadence: Dict[str, float] = {}
+        for kind in PREFETCH_KINDS:
+            ttl = settings.vrc_cache_ttl.get(kind, 0)
+            if ttl > 0:
+                self.cadence[kind] = min(ttl, self.interval)
+        self.tick = min(self.cadence.values(), default=self.interval)
+        self._due: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run: Optional[float] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(START_DELAY)
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"后台预取失败: {e}")
+            await asyncio.sleep(self.tick)
+
+    def due_kinds(self) -> Set[str]:
+        """到了检查周期的类型，同时安排这些类型的下一次检查"""
+        now = time.monotonic()
+        kinds = {kind for kind in self.cadence if self._due.get(kind, 0) <= now}
+        for kind in kinds:
+            self._due[kind] = now + self.cadence[kind]
+        return kinds
+
+    async def targets(self, kinds: Optional[Set[str]] = None) -> List[str]:
+        """需要检查的端点：绑定用户在前，热门实体在后；kinds 为 None 时包含所有预取的类型"""
+        kinds = set(self.cadence) if kinds is None else kinds
+        endpoints = []
+        if "users" in kinds:
+            for (vrc_id,) in await fetchall("SELECT vrc_id FROM user_info"):
+                endpoints += [f"users/{vrc_id}", f"users/{vrc_id}/groups"]
+        for kind in HOT_KINDS:
+            if kind in kinds:
+                endpoints += [f"{kind}/{entity_id}" for entity_id in VRChatAPI.hot_entities(kind, self.hot_limit)]
+        return list(dict.fromkeys(endpoints))
+
+    async def _wait_turn(self, endpoint: str):
+        """等待预取令牌，以及主限流器有足够余量"""
+        await self._budget.acquire(endpoint)
+        while VRChatAPI.rate_limit_headroom(endpoint) < 1 - self.share:
+            await asyncio.sleep(HEADROOM_POLL)
+
+    async def run_once(self) -> int:
+        """
+        执行一轮预取，只检查到了周期的类型
+
+        Returns:
+            实际刷新的端点数
+        """
+        refreshed = 0
+        for endpoint in await self.targets(self.due_kinds()):
+            # 提前一个周期刷新，保证该类型下一次检查之前缓存都是新的
+            if not await self.api.needs_prefetch(endpoint, self.cadence[cache_kind(endpoint)]):
+                continue
+            await self._wait_turn(endpoint)
+            try:
+                await self.api.prefetch(endpoint)
+                refreshed += 1
+            except VRChatAPIError:
+                self.failed += 1
+        self.rounds += 1
+        self.refreshed += refreshed
+        self.last_run = time.time()
+        if refreshed:
+            logger.debug(f"后台预取完成，刷新 {refreshed} 项")
+        return refreshed
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "rounds": self.rounds,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
+
+
+prefetcher = Prefetcher()
@@ -0,0 +1,244 @@
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+import aiofiles
+import ujson
+from websockets.asyncio.client import connect as ws_connect
+
+from mengluo_vrc_bot.config.settings import settings
+from mengluo_vrc_bot.services.account_refresh import USER_AGENT, pool
+from mengluo_vrc_bot.services.log import logger
+from mengluo_vrc_bot.utils.vrchat_models import Friend
+from mengluo_vrc_bot.utils.vrchat_utils import VRChatAPI
+
+RECONNECT_BASE = 1.0
+RECONNECT_MAX = 60.0
+
+
+class PresenceTable:
+    """
+    好友在线状态表
+
+    说明:
+        由 pipeline 事件增量更新，(重新)连接后用好友列表接口做一次全量同步。
+        与 auth/user/friends 的语义一致：网页端在线的好友在在线列表中，location 为 "offline"。
+    """
+
+    def __init__(self):
+        self._online: Dict[str, Friend] = {}
+        self._offline: Dict[str, Friend] = {}
+        self.ready = False
+        self.synced_at: Optional[float] = None
+        self.events: Counter = Counter()
+
+    def reset(self, online: List[Friend], offline: List[Friend]):
+        """用全量同步的结果替换当前状态"""
+        self._online = {friend.id: friend for friend in online}
+        self._offline = {friend.id: friend for friend in offline if friend.id not in self._online}
+        self.synced_at = time.time()
+        self.ready = True
+
+    def friends(self, offline: bool = False, limit: Optional[int] = None) -> List[Friend]:
+        """获取在线（或离线）好友"""
+        friends = list((self._offline if offline else self._online).values())
+        return friends if limit is None else friends[:limit]
+
+    def get(self, user_id: str) -> Optional[Friend]:
+        """按id获取好友（在线或离线），不是好友时返回 None"""
+        return self._online.get(user_id) or self._offline.get(user_id)
+
+    def apply(self, event_type: str, content: Dict) -> bool:
+        """
+        应用一条 pipeline 事件
+
+        Returns:
+            是否为好友状态相关的事件
+        """
+        user_id = content.get("userId")
+        if not user_id or not event_type.startswith("friend-"):
+            return False
+        self.events[event_type] += 1
+
+        if event_type == "friend-delete":
+            self._online.pop(user_id, None)
+            self._offline.pop(user_id, None)
+        elif event_type == "friend-online":
+            self._upsert(content, True, location=content.get("location") or "private",
+                         platform=content.get("platform", ""))
+        elif event_type == "friend-active":
+            self._upsert(content, True, location="offline", platform=content.get("platform", "web"))
+        elif event_type == "friend-offline":
+            self._upsert(content, False, location="offline", platform="")
+        elif event_type == "friend-location":
+            location = content.get("location") or "private"
+            if location == "traveling":
+                location = content.get("travelingToLocation") or location
+            self._upsert(content, True, location=location)
+        elif event_type == "friend-add":
+            state = (content.get("user") or {}).get("state", "offline")
+            self._upsert(content, state != "offline")
+        elif event_type == "friend-update":
+            self._upsert(content, None)
+        else:
+            return False
+        return True
+
+    def _upsert(self, content: Dict, online: Optional[bool], **changes):
+        """
+        更新好友资料和状态
+
+        Args:
+            online: 更新后是否在线，None 表示保持原状态
+            **changes: 需要覆盖的字段（location/platform）
+        """
+        user_id = content["userId"]
+        was_online = user_id in self._online
+        current = self._online.pop(user_id, None) or self._offline.pop(user_id, None)
+        user = content.get("user")
+        if user:
+            # 事件中的 user 对象不一定带有最新位置，保留已知的位置信息
+            friend = Friend.from_dict(user)
+            friend.id = user_id
+            if current is not None:
+                friend.location = current.location
+                friend.platform = current.platform
+        else:
+            friend = current or Friend(id=user_id)
+        for name, value in changes.items():
+            setattr(friend, name, value)
+        if online is None:
+            online = was_online if current is not None else friend.location != "offline"
+        (self._online if online else self._offline)[user_id] = friend
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready,
+            "online": len(self._online),
+            "offline": len(self._offline),
+            "synced_at": self.synced_at,
+            "events": dict(self.events),
+        }
+
+
+class PipelineSubscriber:
+    """
+    VRChat pipeline websocket 订阅者
+
+    说明:
+        每次连接成功后先全量同步好友列表，再依次处理事件；
+        同步期间到达的事件由 websocket 缓冲，同步结束后按顺序补上。
+        断线后按带随机抖动的指数退避重连；认证失败时带上失效的cookie重新登录，
+        cookie已被其他请求换新时直接使用新cookie，多次重连不会重复登录。
+
+    Args:
+        table: 要维护的状态表
+        url: pipeline 地址，默认使用配置项 VRC_PIPELINE_URL
+        connect: websocket 连接函数，测试时可替换
+        record_path: 非空时把收到的原始事件追加写入该文件，供模拟服务器回放
+    """
+
+    def __init__(
+        self,
+        table: PresenceTable,
+        url: Optional[str] = None,
+        connect: Callable = ws_connect,
+        record_path: Optional[str] = None,
+    ):
+        self.table = table
+        self.url = url or settings.vrc_pipeline_url
+        self._connect = connect
+        self.record_path = record_path
+        self._task: Optional[asyncio.Task] = None
+        self._cookie: Optional[Dict[str, str]] = None  # 当前连接使用的cookie
+        self._stale_cookie: Optional[Dict[str, str]] = None  # 收到认证错误的连接使用的cookie
+        self._attempt = 0
+        self._last_event = 0.0
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.table.ready = False
+
+    async def _run(self):
+        while True:
+            try:
+                await self._session()
+                logger.warning("pipeline 连接已关闭")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"pipeline 连接断开: {e}")
+            self.table.ready = False
+            delay = random.uniform(0, min(RECONNECT_MAX, RECONNECT_BASE * 2 ** self._attempt))
+            self._attempt += 1
+            await asyncio.sleep(delay)
+
+    async def _session(self):
+        if self._stale_cookie is not None:
+            # 其他请求已经换过cookie时不再重复登录
+            stale, self._stale_cookie = self._stale_cookie, None
+            await pool.primary.update_cookie(stale=stale)
+        cookie = self._cookie = await pool.primary.get_cookie()
+        async with self._connect(
+            f"{self.url}?authToken={cookie['auth']}", user_agent_header=USER_AGENT
+        ) as websocket:
+            logger.info("已连接 pipeline，开始同步好友列表")
+            await self.resync()
+            self._attempt = 0
+            self._last_event = time.monotonic()
+            async for raw in websocket:
+                await self._handle(raw)
+
+    async def resync(self):
+        """全量同步好友列表"""
+        api = VRChatAPI()
+        online = [friend async for friend in api.iter_friends(offline=False)]
+        offline = [friend async for friend in api.iter_friends(offline=True)]
+        self.table.reset(online, offline)
+        logger.info(f"好友列表同步完成，在线 {len(online)}，离线 {len(offline)}")
+
+    async def _handle(self, raw):
+        try:
+            message = ujson.loads(raw)
+        except ValueError:
+            logger.warning(f"无法解析的 pipeline 消息: {raw!r:.200}")
+            return
+        if not isinstance(message, dict):
+            return
+        if self.record_path:
+            await self._record(message)
+        if "err" in message:
+            logger.error(f"pipeline 返回错误: {message['err']}")
+            self._stale_cookie = self._cookie
+            return
+        content = message.get("content")
+        if isinstance(content, str):
+            try:
+                content = ujson.loads(content)
+            except ValueError:
+                return
+        if isinstance(content, dict):
+            self.table.apply(message.get("type", ""), content)
+
+    async def _record(self, message: Dict):
+        now = time.monotonic()
+        delay = round(now - self._last_event, 3)
+        self._last_event = now
+        async with aiofiles.open(self.record_path, "a", encoding="utf-8") as f:
+            await f.write(ujson.dumps({"delay": delay, **message}, ensure_ascii=False) + "\n")
+
+
+presence = PresenceTable()
+subscriber = PipelineSubscriber(presence, record_path=settings.vrc_presence_record_file or None)
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from typing import Dict, Optional
+
+from mengluo_vrc_bot.config.settings import settings
+from mengluo_vrc_bot.services.account_refresh import SessionPool, VRCAuthError, pool
+from mengluo_vrc_bot.services.log import logger
+
+
+class SessionKeeper:
+    """
+    会话保活
+
+    说明:
+        启动后立即、之后每隔 interval 秒检查会话池中的每个账号：
+        auth cookie 将在 refresh_before 秒内过期的提前重新登录，其余的用 GET auth 校验，
+        已失效的立即重新登录。这样cookie失效、过期和启动时读取cookie文件的开销都由后台承担，
+        不会落在用户请求上。各账号的健康状态见 SessionPool.stats()。
+
+    Args:
+        sessions: 要维护的会话池，默认使用全局会话池
+        interval: 检查间隔秒数，默认使用配置项 VRC_SESSION_CHECK_INTERVAL
+        refresh_before: 提前多少秒刷新即将过期的cookie，默认使用配置项 VRC_SESSION_REFRESH_BEFORE
+    """
+
+    def __init__(
+        self,
+        sessions: Optional[SessionPool] = None,
+        interval: Optional[float] = None,
+        refresh_before: Optional[float] = None,
+    ):
+        self.pool = sessions or pool
+        self.interval = interval or settings.vrc_session_check_interval
+        self.refresh_before = refresh_before if refresh_before is not None else settings.vrc_session_refresh_before
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.checks = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.last_run: Optional[float] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"会话保活失败: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> int:
+        """
+        检查一轮所有账号
+
+        Returns:
+            本轮重新登录的账号数
+        """
+        refreshed = 0
+        for session in self.pool.sessions:
+            logins = session.logins
+            try:
+                if session.expires_within(self.refresh_before):
+                    logger.info(f"账号{session.name}的Cookie即将过期，提前重新登录")
+                    await session.refresh()
+                else:
+                    self.checks += 1
+                    if await session.check() is None:
+                        logger.warning(f"账号{session.name}的会话状态未知，下一轮再检查")
+            except VRCAuthError as e:
+                self.failed += 1
+                logger.error(f"会话保活时登录失败: {e}")
+            refreshed += session.logins > logins
+        self.rounds += 1
+        self.refreshed += refreshed
+        self.last_run = time.time()
+        return refreshed
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "rounds": self.rounds,
+            "checks": self.checks,
+            "refreshed": self.refreshed,
+            "failed": self.failed,
+            "last_run": self.last_run,
+        }
+
+
+keeper = SessionKeeper()
@@ -0,0 +1,398 @@
+import asyncio
+import heapq
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import ujson
+
+from mengluo_vrc_bot.services.log import logger
+
+# 可缓存的端点首段 -> 缓存类型
+CACHE_KINDS = {
+    "users": "users",
+    "worlds": "worlds",
+    "avatars": "avatars",
+    "groups": "groups",
+    "file": "file",
+    "instances": "instances",
+}
+
+
+def cache_kind(endpoint: str) -> Optional[str]:
+    """获取端点对应的缓存类型，不可缓存（如 auth/、带查询参数）时返回 None"""
+    if "?" in endpoint:
+        return None
+    return CACHE_KINDS.get(endpoint.split("/", 1)[0])
+
+
+class CacheEntry:
+    """缓存条目"""
+
+    __slots__ = ("value", "stored_at", "expires_at")
+
+    def __init__(self, value: Any, stored_at: float, expires_at: float):
+        self.value = value
+        self.stored_at = stored_at  # time.time()
+        self.expires_at = expires_at
+
+    @property
+    def fresh(self) -> bool:
+        return time.time() < self.expires_at
+
+    @property
+    def age(self) -> float:
+        return time.time() - self.stored_at
+
+    @property
+    def stale_for(self) -> float:
+        """已过期的秒数，未过期时为负数"""
+        return time.time() - self.expires_at
+
+
+class LRUCache:
+    """有容量上限的内存 LRU 缓存，过期条目保留到被淘汰为止"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry):
+        self._data[key] = entry
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: str):
+        self._data.pop(key, None)
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DecayingCounter:
+    """
+    带指数衰减的访问频率计数（LFU）
+
+    说明:
+        每次访问计数加一，计数每经过 half_life 秒减半，
+        因此近期频繁访问的key排在前面，过去的热点会逐渐让位。
+        超过容量时淘汰计数最低的一批key。
+    """
+
+    def __init__(self, half_life: float, max_entries: int):
+        self.half_life = half_life
+        self.max_entries = max_entries
+        self._scores: Dict[str, Tuple[float, float]] = {}  # key -> (计数, 更新时间)
+
+    def _decayed(self, key: str, now: float) -> float:
+        score, updated = self._scores.get(key, (0.0, now))
+        return score * 0.5 ** ((now - updated) / self.half_life)
+
+    def hit(self, key: str):
+        now = time.monotonic()
+        self._scores[key] = (self._decayed(key, now) + 1, now)
+        if len(self._scores) > self.max_entries:
+            # 一次淘汰到 90%，避免每次访问都要排序
+            keep = heapq.nlargest(
+                self.max_entries * 9 // 10, self._scores, key=lambda k: self._decayed(k, now)
+            )
+            self._scores = {k: self._scores[k] for k in keep}
+
+    def score(self, key: str) -> float:
+        return self._decayed(key, time.monotonic())
+
+    def top(self, n: int, prefix: str = "") -> List[str]:
+        """计数最高的 n 个key，可按前缀过滤"""
+        now = time.monotonic()
+        keys = [key for key in self._scores if key.startswith(prefix)]
+        return heapq.nlargest(n, keys, key=lambda k: self._decayed(k, now))
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+
+class NegativeCache:
+    """
+    "资源不存在"结果的短期缓存
+
+    说明:
+        与实体缓存相互独立，使用自己的容量上限和 TTL，
+        让 404 结果按更短的周期过期。
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def contains(self, key: str) -> bool:
+        """端点是否在有效期内被记录为不存在"""
+        expires_at = self._data.get(key)
+        if expires_at is not None and time.time() < expires_at:
+            self.hits += 1
+            return True
+        if expires_at is not None:
+            del self._data[key]
+        self.misses += 1
+        return False
+
+    def add(self, key: str):
+        if self.ttl <= 0:
+            return
+        self._data[key] = time.time() + self.ttl
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key: str):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+        }
+
+
+class SQLiteCache:
+    """
+    基于 SQLite 的持久化缓存层，阻塞操作在线程池中执行
+
+    说明:
+        encoder 把缓存值转换为可 JSON 序列化的数据，
+        decoder 根据 key 把读出的数据还原为缓存值，默认均原样存取。
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        encoder: Optional[Callable[[Any], Any]] = None,
+        decoder: Optional[Callable[[str, Any], Any]] = None,
+    ):
+        self.path = path
+        self.encoder = encoder or (lambda value: value)
+        self.decoder = decoder or (lambda key, data: data)
+        self._init_db()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS entity_cache
+                            (key TEXT PRIMARY KEY,
+                             kind TEXT NOT NULL,
+                             value TEXT NOT NULL,
+                             stored_at REAL NOT NULL,
+                             expires_at REAL NOT NULL)''')
+
+    def _get(self, key: str) -> Optional[CacheEntry]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at FROM entity_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None
+        return CacheEntry(self.decoder(key, ujson.loads(row[0])), row[1], row[2])
+
+    def _set(self, key: str, kind: str, entry: CacheEntry):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entity_cache (key, kind, value, stored_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (
+                    key,
+                    kind,
+                    ujson.dumps(self.encoder(entry.value), ensure_ascii=False),
+                    entry.stored_at,
+                    entry.expires_at,
+                ),
+            )
+
+    def _delete(self, key: Optional[str], kind: Optional[str]):
+        with self._connect() as conn:
+            if key is not None:
+                conn.execute("DELETE FROM entity_cache WHERE key = ?", (key,))
+            elif kind is not None:
+                conn.execute("DELETE FROM entity_cache WHERE kind = ?", (kind,))
+            else:
+                conn.execute("DELETE FROM entity_cache")
+
+    def _prune(self, before: float) -> int:
+        with self._connect() as conn:
+            count = conn.execute("DELETE FROM entity_cache WHERE expires_at < ?", (before,)).rowcount
+        return count
+
+    async def get(self, key: str) -> Optional[CacheEntry]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, kind: str, entry: CacheEntry):
+        await asyncio.to_thread(self._set, key, kind, entry)
+
+    async def delete(self, key: Optional[str] = None, kind: Optional[str] = None):
+        await asyncio.to_thread(self._delete, key, kind)
+
+    async def prune(self, before: float) -> int:
+        """删除在 before 之前就已过期的条目"""
+        return await asyncio.to_thread(self._prune, before)
+
+
+class EntityCache:
+    """
+    VRChat 实体两级缓存
+
+    说明:
+        内存 LRU 在前，可选的 SQLite 持久层在后；持久层命中会回填到内存。
+        每种实体类型使用各自的 TTL。内存中直接保存解码后的对象，
+        encoder/decoder 只在读写持久层时使用。
+    """
+
+    def __init__(
+        self,
+        ttl: Dict[str, float],
+        max_entries: int,
+        persistent_path: Optional[Path] = None,
+        encoder: Optional[Callable[[Any], Any]] = None,
+        decoder: Optional[Callable[[str, Any], Any]] = None,
+    ):
+        self.ttl = ttl
+        self.memory = LRUCache(max_entries)
+        self.persistent: Optional[SQLiteCache] = None
+        if persistent_path is not None:
+            try:
+                self.persistent = SQLiteCache(persistent_path, encoder, decoder)
+            except sqlite3.Error as e:
+                logger.error(f"初始化持久化缓存失败，仅使用内存缓存: {e}")
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.stale_hits = 0
+
+    async def lookup(self, key: str) -> Optional[CacheEntry]:
+        """依次查询内存和持久层，返回条目本身（可能已过期），不计入命中统计"""
+        entry = self.memory.get(key)
+        if entry is None and self.persistent is not None:
+            try:
+                entry = await self.persistent.get(key)
+            except sqlite3.Error as e:
+                logger.error(f"读取持久化缓存失败: {e}")
+                entry = None
+            if entry is not None:
+                self.memory.set(key, entry)
+                if entry.fresh:
+                    self.persistent_hits += 1
+        return entry
+
+    async def get(self, key: str) -> Optional[Any]:
+        """获取未过期的缓存值"""
+        entry = await self.lookup(key)
+        if entry is not None and entry.fresh:
+            self.hits += 1
+            return entry.value
+        self.misses += 1
+        return None
+
+    def peek(self, key: str) -> Optional[Any]:
+        """只查内存，返回缓存值（可能已过期），不计入命中统计"""
+        entry = self.memory.get(key)
+        return entry.value if entry is not None else None
+
+    def record_hit(self, stale: bool = False):
+        """记录一次由调用方基于 lookup() 判定的命中"""
+        if stale:
+            self.stale_hits += 1
+        else:
+            self.hits += 1
+
+    def record_miss(self):
+        self.misses += 1
+
+    async def set(self, kind: str, key: str, value: Any):
+        """写入缓存，TTL 按实体类型决定"""
+        ttl = self.ttl.get(kind, 0)
+        if ttl <= 0:
+            return
+        now = time.time()
+        entry = CacheEntry(value, now, now + ttl)
+        self.memory.set(key, entry)
+        if self.persistent is not None:
+            try:
+                await self.persistent.set(key, kind, entry)
+            except sqlite3.Error as e:
+                logger.error(f"写入持久化缓存失败: {e}")
+
+    async def invalidate(self, key: Optional[str] = None, kind: Optional[str] = None):
+        """
+        使缓存失效
+
+        Args:
+            key: 指定端点，优先
+            kind: 指定实体类型；两者都为空时清空全部缓存
+        """
+        if key is not None:
+            self.memory.pop(key)
+        elif kind is not None:
+            for k in self.memory.keys():
+                if cache_kind(k) == kind:
+                    self.memory.pop(k)
+        else:
+            self.memory.clear()
+        if self.persistent is not None:
+            try:
+                await self.persistent.delete(key, kind)
+            except sqlite3.Error as e:
+                logger.error(f"清理持久化缓存失败: {e}")
+
+    async def prune(self, max_stale: float = 0) -> int:
+        """清理持久层中过期超过 max_stale 秒的条目"""
+        if self.persistent is None:
+            return 0
+        try:
+            return await self.persistent.prune(time.time() - max_stale)
+        except sqlite3.Error as e:
+            logger.error(f"清理持久化缓存失败: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "stale_hits": self.stale_hits,
+            "evictions": self.memory.evictions,
+            "size": len(self.memory),
+        }
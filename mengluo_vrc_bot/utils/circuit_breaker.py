@@ -0,0 +1,132 @@
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from mengluo_vrc_bot.services.log import logger
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，请求被直接拒绝"""
+    pass
+
+
+class CircuitBreaker:
+    """
+    基于错误率的熔断器
+
+    说明:
+        统计最近 window 次调用，至少 min_calls 次且失败率达到 failure_rate 时打开；
+        打开 reset_timeout 秒后进入半开状态，最多放行 half_open_max 个探测请求，
+        探测成功则关闭，失败则重新打开。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = 20,
+        failure_rate: float = 0.5,
+        min_calls: int = 10,
+        reset_timeout: float = 30.0,
+        half_open_max: int = 1,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.half_open_max = half_open_max
+        self._results: deque = deque(maxlen=window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def _transition(self, state: str):
+        if state == self._state:
+            return
+        self._state = state
+        self._probes = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+            self.trips += 1
+            logger.warning(f"熔断器[{self.name}]已打开，{self.reset_timeout:.0f} 秒后尝试恢复")
+        elif state == HALF_OPEN:
+            logger.info(f"熔断器[{self.name}]进入半开状态，开始探测")
+        else:
+            self._results.clear()
+            logger.info(f"熔断器[{self.name}]已关闭")
+
+    def before_call(self):
+        """
+        请求前调用，决定是否放行
+
+        Raises:
+            CircuitOpenError: 熔断器打开，或半开状态下探测名额已满
+        """
+        state = self.state
+        if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_max):
+            self.rejected += 1
+            raise CircuitOpenError(f"{self.name} 熔断中")
+        if state == HALF_OPEN:
+            self._probes += 1
+
+    def release(self):
+        """放行的请求未产生结果（如被取消）时归还半开探测名额"""
+        if self._state == HALF_OPEN and self._probes > 0:
+            self._probes -= 1
+
+    def record_success(self):
+        if self._state == HALF_OPEN:
+            self._transition(CLOSED)
+        self._results.append(True)
+
+    def record_failure(self):
+        if self._state == HALF_OPEN:
+            self._transition(OPEN)
+            return
+        self._results.append(False)
+        if self._state == CLOSED and len(self._results) >= self.min_calls:
+            failures = self._results.count(False)
+            if failures / len(self._results) >= self.failure_rate:
+                self._transition(OPEN)
+
+    def stats(self) -> Dict[str, object]:
+        calls = len(self._results)
+        failures = self._results.count(False)
+        return {
+            "state": self.state,
+            "error_rate": round(failures / calls, 2) if calls else 0.0,
+            "calls": calls,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
+
+
+class CircuitBreakerRegistry:
+    """按主机名管理熔断器"""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = self._breakers[host] = CircuitBreaker(host, **self.options)
+        return breaker
+
+    def find(self, host: str) -> Optional[CircuitBreaker]:
+        return self._breakers.get(host)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {host: breaker.stats() for host, breaker in self._breakers.items()}
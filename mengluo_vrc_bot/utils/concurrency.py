@@ -0,0 +1,54 @@
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any, Dict
+
+
+class SingleFlight:
+    """合并相同 key 的并发调用。
+
+    说明:
+        同一时刻相同 key 只会真正执行一次，其余调用者等待并共享同一个结果（或异常）。
+        实际执行放在独立的 Task 中，某个等待者被取消不会影响其他等待者。
+    """
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0  # 实际执行次数
+        self.shared = 0  # 被合并（复用结果）的次数
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行或加入一个进行中的调用。
+
+        参数:
+            key: 调用的唯一标识。
+            func: 无参协程函数，仅在没有进行中的同 key 调用时执行。
+
+        返回:
+            Any: func 的返回值。
+        """
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.executed += 1
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    @property
+    def in_flight(self) -> int:
+        """当前进行中的调用数。"""
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, int]:
+        """返回合并统计。"""
+        return {
+            "executed": self.executed,
+            "shared": self.shared,
+            "in_flight": self.in_flight,
+        }
@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from mengluo_vrc_bot.services.log import logger
+
+from .vrchat_models import FileInfo
+
+
+class FileMeta:
+    """某个文件版本中会用到的元数据"""
+
+    __slots__ = ("name", "owner_id", "size_in_bytes")
+
+    def __init__(self, name: str, owner_id: str, size_in_bytes: int):
+        self.name = name
+        self.owner_id = owner_id
+        self.size_in_bytes = size_in_bytes
+
+    def __repr__(self) -> str:
+        return f"FileMeta({self.name!r}, {self.size_in_bytes})"
+
+
+def metas_from_file_info(file_info: FileInfo) -> Dict[int, FileMeta]:
+    """从文件信息中取出所有已上传完成（有文件大小）的版本"""
+    return {
+        version.version: FileMeta(file_info.name, file_info.owner_id, version.size_in_bytes)
+        for version in file_info.versions
+        if version.size_in_bytes is not None
+    }
+
+
+class FileMetaStore:
+    """
+    不可变的文件元数据存储
+
+    说明:
+        文件的某个版本一经发布就不会再变化，因此以 (file_id, version) 为key永久保存，没有TTL。
+        只保存名称、上传者和文件大小三项，内存 LRU 在前，可选的 SQLite 持久层在后。
+    """
+
+    def __init__(self, max_entries: int, persistent_path: Optional[Path] = None):
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[Tuple[str, int], FileMeta]" = OrderedDict()
+        self.path = persistent_path
+        if persistent_path is not None:
+            try:
+                self._init_db()
+            except sqlite3.Error as e:
+                self.path = None
+                logger.error(f"初始化文件元数据存储失败，仅使用内存: {e}")
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS file_meta
+                            (file_id TEXT NOT NULL,
+                             version INTEGER NOT NULL,
+                             name TEXT NOT NULL,
+                             owner_id TEXT NOT NULL,
+                             size INTEGER NOT NULL,
+                             PRIMARY KEY (file_id, version)) WITHOUT ROWID''')
+
+    def _get(self, file_id: str, version: int) -> Optional[FileMeta]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT name, owner_id, size FROM file_meta WHERE file_id = ? AND version = ?",
+                (file_id, version),
+            ).fetchone()
+        return FileMeta(*row) if row else None
+
+    def _add(self, file_id: str, metas: Dict[int, FileMeta]):
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO file_meta (file_id, version, name, owner_id, size) VALUES (?, ?, ?, ?, ?)",
+                [(file_id, version, meta.name, meta.owner_id, meta.size_in_bytes) for version, meta in metas.items()],
+            )
+
+    def _remember(self, key: Tuple[str, int], meta: FileMeta):
+        self._memory[key] = meta
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, file_id: str, version: int) -> Optional[FileMeta]:
+        key = (file_id, version)
+        meta = self._memory.get(key)
+        if meta is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return meta
+        if self.path is not None:
+            try:
+                meta = await asyncio.to_thread(self._get, file_id, version)
+            except sqlite3.Error as e:
+                logger.error(f"读取文件元数据失败: {e}")
+            if meta is not None:
+                self._remember(key, meta)
+                self.persistent_hits += 1
+                return meta
+        self.misses += 1
+        return None
+
+    async def add(self, file_id: str, metas: Dict[int, FileMeta]):
+        """保存文件的各个版本，已存在的版本不会被覆盖"""
+        if not metas:
+            return
+        for version, meta in metas.items():
+            self._remember((file_id, version), meta)
+        if self.path is not None:
+            try:
+                await asyncio.to_thread(self._add, file_id, metas)
+            except sqlite3.Error as e:
+                logger.error(f"写入文件元数据失败: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "size": len(self._memory),
+        }
@@ -0,0 +1,201 @@
+import bisect
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# 毫秒
+DEFAULT_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ID_SEGMENT_PATTERN = re.compile(r"^[a-z]+_[0-9a-zA-Z-]{8,}$")
+NUMBER_SEGMENT_PATTERN = re.compile(r"^\d+$")
+API_PREFIX = "/api/1/"
+
+
+def normalize_endpoint(url: str) -> str:
+    """
+    将 URL 归一化为端点模板，控制统计维度的数量
+
+    例如 https://api.vrchat.cloud/api/1/users/usr_xxx/groups -> api.vrchat.cloud users/{id}/groups
+    """
+    parsed = urlparse(url)
+    path = parsed.path
+    if path.startswith(API_PREFIX):
+        path = path[len(API_PREFIX):]
+    segments = []
+    for segment in path.strip("/").split("/"):
+        if ID_SEGMENT_PATTERN.match(segment):
+            segments.append("{id}")
+        elif NUMBER_SEGMENT_PATTERN.match(segment):
+            segments.append("{n}")
+        elif ":" in segment or len(segment) > 40:
+            segments.append("{key}")
+        else:
+            segments.append(segment)
+    return f"{parsed.netloc} {'/'.join(segments)}"
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    __slots__ = ("buckets", "counts", "count", "total", "min", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """按分桶上界估算分位数（不超过实际最大值）"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return min(self.buckets[index], self.max) if index < len(self.buckets) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 2) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class EndpointMetrics:
+    """单个端点的统计数据"""
+
+    __slots__ = ("total", "connect", "tls", "status", "bytes_sent", "bytes_received")
+
+    def __init__(self):
+        self.total = Histogram()
+        self.connect = Histogram()  # 包含 DNS 解析
+        self.tls = Histogram()
+        self.status: Counter = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "total_ms": self.total.snapshot(),
+            "connect_ms": self.connect.snapshot(),
+            "tls_ms": self.tls.snapshot(),
+            "status": dict(self.status),
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+
+class RequestTrace:
+    """
+    单次请求的计时，作为 httpx 的 trace 扩展使用
+
+    说明:
+        httpcore 的 connect_tcp 事件包含 DNS 解析，没有单独的 DNS 事件；
+        复用连接时不会产生 connect/tls 事件。
+    """
+
+    __slots__ = ("_started", "connect_ms", "tls_ms")
+
+    def __init__(self):
+        self._started: Dict[str, float] = {}
+        self.connect_ms: Optional[float] = None
+        self.tls_ms: Optional[float] = None
+
+    async def __call__(self, event_name: str, info: dict):
+        name, _, stage = event_name.rpartition(".")
+        if stage == "started":
+            self._started[name] = time.perf_counter()
+        elif stage == "complete" and name in self._started:
+            elapsed = (time.perf_counter() - self._started.pop(name)) * 1000
+            if name.endswith("connect_tcp") or name.endswith("connect_unix_socket"):
+                self.connect_ms = elapsed
+            elif name.endswith("start_tls"):
+                self.tls_ms = elapsed
+
+
+class HttpMetrics:
+    """按归一化端点汇总的 HTTP 请求统计"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+
+    def record(
+        self,
+        url: str,
+        status: str,
+        total_ms: float,
+        trace: Optional[RequestTrace] = None,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+    ):
+        endpoint = normalize_endpoint(url)
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = EndpointMetrics()
+        metrics.total.observe(total_ms)
+        if trace is not None:
+            if trace.connect_ms is not None:
+                metrics.connect.observe(trace.connect_ms)
+            if trace.tls_ms is not None:
+                metrics.tls.observe(trace.tls_ms)
+        metrics.status[status] += 1
+        metrics.bytes_sent += bytes_sent
+        metrics.bytes_received += bytes_received
+
+    def snapshot(self, endpoint: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+        """返回全部（或指定端点）的统计快照"""
+        return {
+            name: metrics.snapshot()
+            for name, metrics in self._endpoints.items()
+            if endpoint is None or name == endpoint
+        }
+
+    def reset(self):
+        self._endpoints.clear()
+
+    def to_prometheus(self, prefix: str = "mengluo_http") -> str:
+        """导出为 Prometheus 文本格式"""
+        lines: List[str] = []
+        for name, metrics in self._endpoints.items():
+            host, _, path = name.partition(" ")
+            labels = f'host="{host}",endpoint="{path}"'
+            for metric, histogram in (
+                ("request", metrics.total),
+                ("connect", metrics.connect),
+                ("tls", metrics.tls),
+            ):
+                if not histogram.count:
+                    continue
+                cumulative = 0
+                for bucket, bucket_count in zip(histogram.buckets, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{prefix}_{metric}_ms_bucket{{{labels},le="{bucket}"}} {cumulative}')
+                lines.append(f'{prefix}_{metric}_ms_bucket{{{labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"{prefix}_{metric}_ms_sum{{{labels}}} {histogram.total:.3f}")
+                lines.append(f"{prefix}_{metric}_ms_count{{{labels}}} {histogram.count}")
+            for status, count in metrics.status.items():
+                lines.append(f'{prefix}_responses_total{{{labels},status="{status}"}} {count}')
+            lines.append(f"{prefix}_sent_bytes_total{{{labels}}} {metrics.bytes_sent}")
+            lines.append(f"{prefix}_received_bytes_total{{{labels}}} {metrics.bytes_received}")
+        return "\n".join(lines) + "\n"
+
+
+http_metrics = HttpMetrics()
@@ -1,58 +1,211 @@
-from collections.abc import AsyncGenerator
-from contextlib import asynccontextmanager
+import importlib.util
+import time
+from collections.abc import AsyncGenerator, Iterable
+from http.cookiejar import CookieJar
+from pathlib import Path
+from typing import ClassVar
 
+import aiofiles
 import httpx
-from httpx import AsyncHTTPTransport, HTTPStatusError, Response
+from httpx import AsyncHTTPTransport, HTTPStatusError, Limits, Response
 
+from mengluo_vrc_bot.config.settings import settings
 from mengluo_vrc_bot.services.log import logger
+from .http_metrics import RequestTrace, http_metrics
 
-CLIENT_KEY = ["use_proxy", "proxy", "verify", "headers"]
+CLIENT_KEY = ["use_proxy", "proxy", "verify", "headers", "transport"]
 USER_AGENT = {"User-Agent": "mengluo_vrc_bot/1.0"}
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+DEFAULT_CHUNK_SIZE = 64 * 1024
+IMAGE_TYPES = ("image/",)
+
+
+class DownloadError(Exception):
+    """流式下载被中止（状态码错误、类型不允许或超出大小上限）"""
+    pass
+
+
+def _content_type_allowed(content_type: str, allowed_types: Iterable[str] | None) -> bool:
+    """检查 Content-Type 是否在允许列表中，以 / 结尾的条目按前缀匹配"""
+    if allowed_types is None:
+        return True
+    mime = content_type.split(";", 1)[0].strip().lower()
+    for allowed in allowed_types:
+        allowed = allowed.lower()
+        if mime == allowed or (allowed.endswith("/") and mime.startswith(allowed)):
+            return True
+    return False
+
+
+class _StatelessCookieJar(CookieJar):
+    """不保存响应 Cookie 的 CookieJar，避免共享客户端在不同请求之间串用登录态。"""
+
+    def extract_cookies(self, response, request):
+        return
+
+
+def _request_size(request: httpx.Request) -> int:
+    """请求体字节数，流式请求体未读取时按 Content-Length 计算"""
+    try:
+        return len(request.content)
+    except httpx.RequestNotRead:
+        return int(request.headers.get("Content-Length", 0))
+
+
+def get_pool_limits() -> Limits:
+    """根据配置生成连接池限制。"""
+    return Limits(
+        max_connections=settings.vrc_http_max_connections,
+        max_keepalive_connections=settings.vrc_http_max_keepalive,
+        keepalive_expiry=settings.vrc_http_keepalive_expiry,
+    )
+
 
 def get_async_client(verify: bool = False, **kwargs) -> httpx.AsyncClient:
     """创建 httpx.AsyncClient 实例。
     
     参数:
         verify: 是否验证 SSL 证书。
-        **kwargs: 其他传递给 httpx.AsyncClient 的参数。
+        **kwargs: 其他传递给 httpx.AsyncClient 的参数，
+                `limits`、`http2`、`proxy` 会交给底层的 AsyncHTTPTransport。
         
     返回:
         httpx.AsyncClient: 配置好的客户端实例。
     """
-    transport = kwargs.pop("transport", None) or AsyncHTTPTransport(verify=verify)
+    limits = kwargs.pop("limits", None) or get_pool_limits()
+    http2 = kwargs.pop("http2", False)
+    proxy = kwargs.pop("proxy", None)
+    transport = kwargs.pop("transport", None) or AsyncHTTPTransport(
+        verify=verify, limits=limits, http2=http2, proxy=proxy
+    )
     return httpx.AsyncClient(transport=transport, **kwargs)
 
 
 class AsyncHttpx:
-    """异步 HTTP 客户端工具类。"""
+    """异步 HTTP 客户端工具类。
+
+    说明:
+        所有请求共享进程级的连接池（按 verify/proxy/transport 区分），复用 TCP/TLS 连接。
+        连接池在驱动启动时打开、关闭时释放；未启动时会在首次请求时懒加载。
+        可通过 `set_transport` 或单次请求的 `transport` 参数注入自定义传输层
+        （如 httpx.ASGITransport + 本地模拟服务器），用于离线测试和压测。
+    """
+
+    _clients: ClassVar[
+        dict[tuple[bool, str | None, httpx.AsyncBaseTransport | None], httpx.AsyncClient]
+    ] = {}
+    _transport: ClassVar[httpx.AsyncBaseTransport | None] = None
 
     @classmethod
-    @asynccontextmanager
-    async def _create_client(
+    async def set_transport(cls, transport: httpx.AsyncBaseTransport | None):
+        """设置默认传输层，None 表示恢复为真实网络连接。
+
+        参数:
+            transport: 自定义传输层。
+        """
+        await cls.shutdown()
+        cls._transport = transport
+
+    @classmethod
+    def _get_client(
         cls,
         *,
-        headers: dict[str, str] | None = None,
         verify: bool = False,
-        **kwargs,
-    ) -> AsyncGenerator[httpx.AsyncClient, None]:
-        """创建一个私有的、配置好的 httpx.AsyncClient 上下文管理器。
+        proxy: str | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> httpx.AsyncClient:
+        """获取（必要时创建）共享的 httpx.AsyncClient。
 
         参数:
-            headers: 需要合并到客户端的自定义请求头。
             verify: 是否验证 SSL 证书。
-            **kwargs: 其他所有传递给 httpx.AsyncClient 的参数。
+            proxy: 代理地址。
+            transport: 自定义传输层，为空时使用默认传输层。
 
         返回:
-            AsyncGenerator[httpx.AsyncClient, None]: 客户端生成器。
+            httpx.AsyncClient: 连接池中的客户端实例。
         """
-        final_headers = USER_AGENT
-        if headers:
-            final_headers.update(headers)
+        transport = transport or cls._transport
+        key = (verify, proxy, transport)
+        client = cls._clients.get(key)
+        if client is None or client.is_closed:
+            http2 = settings.vrc_http2
+            if http2 and not HTTP2_AVAILABLE:
+                logger.warning("未安装 h2，HTTP/2 已禁用，请执行 pip install httpx[http2]")
+                http2 = False
+            client = get_async_client(
+                verify=verify,
+                proxy=proxy,
+                transport=transport,
+                http2=http2,
+                headers=USER_AGENT,
+                # 直接传入 CookieJar，httpx.Cookies 会被复制到普通 CookieJar 中，导致响应 Cookie 被保存
+                cookies=_StatelessCookieJar(),
+            )
+            if not isinstance(client.cookies.jar, _StatelessCookieJar):
+                client.cookies.jar = _StatelessCookieJar()
+            cls._clients[key] = client
+        return client
+
+    @classmethod
+    async def startup(cls):
+        """预先建立默认客户端，供驱动启动时调用。"""
+        cls._get_client()
+        logger.info("HTTP 连接池已初始化")
 
-        async with get_async_client(
-            verify=verify, headers=final_headers, **kwargs
-        ) as client:
-            yield client
+    @classmethod
+    async def shutdown(cls):
+        """关闭所有共享客户端，供驱动关闭时调用。"""
+        clients = list(cls._clients.values())
+        cls._clients.clear()
+        for client in clients:
+            await client.aclose()
+        if clients:
+            logger.info("HTTP 连接池已关闭")
+
+    @classmethod
+    async def _request(cls, method: str, url: str, **kwargs) -> Response:
+        """使用共享客户端发送请求。
+
+        参数:
+            method: 请求方法。
+            url: 请求的 URL。
+            **kwargs: `CLIENT_KEY` 中的参数用于选择客户端（headers 按请求合并），
+                    其余参数传递给 httpx.AsyncClient.request。
+
+        返回:
+            Response: HTTP 响应对象。
+        """
+        client_kwargs = {k: v for k, v in kwargs.items() if k in CLIENT_KEY}
+        for key in CLIENT_KEY:
+            kwargs.pop(key, None)
+        client = cls._get_client(
+            verify=client_kwargs.get("verify", False),
+            proxy=client_kwargs.get("proxy"),
+            transport=client_kwargs.get("transport"),
+        )
+        trace = RequestTrace()
+        kwargs["extensions"] = {"trace": trace, **kwargs.get("extensions", {})}
+        started = time.perf_counter()
+        try:
+            response = await client.request(
+                method, url, headers=client_kwargs.get("headers"), **kwargs
+            )
+        except Exception as e:
+            http_metrics.record(
+                url, type(e).__name__, (time.perf_counter() - started) * 1000, trace
+            )
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        http_metrics.record(
+            url,
+            str(response.status_code),
+            elapsed,
+            trace,
+            bytes_sent=_request_size(response.request),
+            bytes_received=len(response.content),
+        )
+        logger.debug(f"{method} {url} {response.status_code} {elapsed:.0f}ms")
+        return response
 
     @classmethod
     async def get(
@@ -80,11 +233,7 @@ class AsyncHttpx:
             HTTPStatusError: 当响应状态码与期望不匹配时。
         """
         logger.info(f"开始获取 {url}..")
-        client_kwargs = {k: v for k, v in kwargs.items() if k in CLIENT_KEY}
-        for key in CLIENT_KEY:
-            kwargs.pop(key, None)
-        async with cls._create_client(**client_kwargs) as client:
-            response = await client.get(url, **kwargs)
+        response = await cls._request("GET", url, **kwargs)
 
         if check_status_code and response.status_code != check_status_code:
             raise HTTPStatusError(
@@ -109,11 +258,7 @@ class AsyncHttpx:
         返回:
             Response: HTTP 响应对象。
         """
-        client_kwargs = {k: v for k, v in kwargs.items() if k in CLIENT_KEY}
-        for key in CLIENT_KEY:
-            kwargs.pop(key, None)
-        async with cls._create_client(**client_kwargs) as client:
-            return await client.head(url, **kwargs)
+        return await cls._request("HEAD", url, **kwargs)
 
     @classmethod
     async def post(cls, url: str, **kwargs) -> Response:
@@ -130,8 +275,147 @@ class AsyncHttpx:
         返回:
             Response: HTTP 响应对象。
         """
+        return await cls._request("POST", url, **kwargs)
+
+    @classmethod
+    async def stream(
+        cls,
+        url: str,
+        *,
+        max_bytes: int,
+        allowed_types: Iterable[str] | None = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        **kwargs,
+    ) -> AsyncGenerator[bytes, None]:
+        """以流的方式分块读取响应体。
+
+        说明:
+            在读取响应体之前检查状态码、Content-Type 和 Content-Length，
+            读取过程中累计字节数，超过上限立即中止并关闭连接。
+
+        参数:
+            url: 请求的 URL。
+            max_bytes: 允许读取的最大字节数。
+            allowed_types: (可选) 允许的 Content-Type，如 `("image/",)`，以 / 结尾表示前缀匹配。
+            chunk_size: 每块的字节数。
+            **kwargs: 其他所有传递给 httpx.stream 的参数。
+
+        返回:
+            AsyncGenerator[bytes, None]: 响应体数据块。
+
+        异常:
+            DownloadError: 状态码非 2xx、类型不允许或超过大小上限时。
+        """
         client_kwargs = {k: v for k, v in kwargs.items() if k in CLIENT_KEY}
         for key in CLIENT_KEY:
             kwargs.pop(key, None)
-        async with cls._create_client(**client_kwargs) as client:
-            return await client.post(url, **kwargs)
\ No newline at end of file
+        client = cls._get_client(
+            verify=client_kwargs.get("verify", False),
+            proxy=client_kwargs.get("proxy"),
+            transport=client_kwargs.get("transport"),
+        )
+        trace = RequestTrace()
+        kwargs["extensions"] = {"trace": trace, **kwargs.get("extensions", {})}
+        started = time.perf_counter()
+        received = 0
+        status = "error"
+        try:
+            async with client.stream(
+                "GET", url, headers=client_kwargs.get("headers"), **kwargs
+            ) as response:
+                status = str(response.status_code)
+                if not response.is_success:
+                    raise DownloadError(f"状态码错误: {response.status_code}")
+                content_type = response.headers.get("Content-Type", "")
+                if not _content_type_allowed(content_type, allowed_types):
+                    raise DownloadError(f"不允许的类型: {content_type}")
+                content_length = response.headers.get("Content-Length")
+                if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+                    raise DownloadError(f"文件过大: {content_length} > {max_bytes}")
+                async for chunk in response.aiter_bytes(chunk_size):
+                    received += len(chunk)
+                    if received > max_bytes:
+                        raise DownloadError(f"文件过大: 超过 {max_bytes} 字节")
+                    yield chunk
+        except DownloadError as e:
+            logger.warning(f"下载 {url} 已中止: {e}")
+            raise
+        finally:
+            http_metrics.record(
+                url,
+                status,
+                (time.perf_counter() - started) * 1000,
+                trace,
+                bytes_received=received,
+            )
+
+    @classmethod
+    async def download_bytes(
+        cls,
+        url: str,
+        *,
+        max_bytes: int,
+        allowed_types: Iterable[str] | None = None,
+        **kwargs,
+    ) -> bytes:
+        """下载到内存，最多占用 max_bytes 字节。
+
+        参数:
+            url: 请求的 URL。
+            max_bytes: 允许读取的最大字节数。
+            allowed_types: (可选) 允许的 Content-Type。
+            **kwargs: 其他所有传递给 httpx.stream 的参数。
+
+        返回:
+            bytes: 响应体。
+
+        异常:
+            DownloadError: 状态码非 2xx、类型不允许或超过大小上限时。
+        """
+        buffer = bytearray()
+        async for chunk in cls.stream(
+            url, max_bytes=max_bytes, allowed_types=allowed_types, **kwargs
+        ):
+            buffer += chunk
+        return bytes(buffer)
+
+    @classmethod
+    async def download_file(
+        cls,
+        url: str,
+        path: str | Path,
+        *,
+        max_bytes: int,
+        allowed_types: Iterable[str] | None = None,
+        **kwargs,
+    ) -> int:
+        """下载到文件，先写入临时文件，成功后再替换目标文件。
+
+        参数:
+            url: 请求的 URL。
+            path: 保存路径。
+            max_bytes: 允许读取的最大字节数。
+            allowed_types: (可选) 允许的 Content-Type。
+            **kwargs: 其他所有传递给 httpx.stream 的参数。
+
+        返回:
+            int: 写入的字节数。
+
+        异常:
+            DownloadError: 状态码非 2xx、类型不允许或超过大小上限时。
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.part")
+        written = 0
+        try:
+            async with aiofiles.open(tmp_path, "wb") as f:
+                async for chunk in cls.stream(
+                    url, max_bytes=max_bytes, allowed_types=allowed_types, **kwargs
+                ):
+                    await f.write(chunk)
+                    written += len(chunk)
+            tmp_path.replace(path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        return written
@@ -0,0 +1,528 @@
+"""
+本地 VRChat API 模拟服务器（ASGI）
+
+用于离线测试和压测客户端层，不依赖 nonebot，可以:
+
+- 进程内使用: `httpx.ASGITransport(app=MockVRChatAPI(latency=0.2))`，
+  配合 `AsyncHttpx.set_transport` 或 `VRChatAPI(transport=...)`；
+- 独立运行: `uvicorn mengluo_vrc_bot.utils.mock_vrchat:app --port 8000`，
+  再将 `VRC_API_BASE_URL` 设为 `http://127.0.0.1:8000/api/1/`。
+
+独立运行时可通过环境变量 MOCK_VRC_LATENCY / MOCK_VRC_JITTER /
+MOCK_VRC_ERROR_RATE / MOCK_VRC_RATE_LIMIT_RATE / MOCK_VRC_RETRY_AFTER 调整行为。
+id 中包含 "dead" 的实体始终返回 404。
+
+websocket 连接会被当作 pipeline 处理，回放一段好友事件流：默认为确定性生成的事件，
+MOCK_VRC_PIPELINE_FILE 可指定录制的事件文件（见 VRC_PRESENCE_RECORD_FILE），
+MOCK_VRC_PIPELINE_SPEED 为回放倍速，MOCK_VRC_PIPELINE_CLOSE=1 时回放结束后断开连接。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import uuid
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+API_PREFIX = "/api/1/"
+AUTH_COOKIE = "authcookie_mock"
+AUTH_COOKIE_MAX_AGE = 365 * 86400
+IMAGE_HOST = "https://api.vrchat.cloud/api/1/image"
+PLATFORMS = ["standalonewindows", "android", "ios"]
+TRUST_TAGS = ["system_trust_veteran", "system_trust_trusted", "system_trust_known", "system_trust_basic"]
+STATUSES = ["active", "join me", "ask me", "busy"]
+REGIONS = ["us", "use", "eu", "jp"]
+FRIEND_COUNT = 240
+
+
+def _rng(seed: str) -> random.Random:
+    """按 id 生成确定性的随机数，保证同一实体每次返回相同数据"""
+    return random.Random(int(hashlib.md5(seed.encode()).hexdigest(), 16))
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _date(rng: random.Random) -> str:
+    return (
+        f"20{rng.randint(18, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        f"T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}.000Z"
+    )
+
+
+def _file_url(file_id: str, version: int = 1) -> str:
+    return f"https://api.vrchat.cloud/api/1/file/{file_id}/{version}/file"
+
+
+def mock_user(user_id: str) -> Dict:
+    rng = _rng(user_id)
+    avatar_file = f"file_{_uuid(rng)}"
+    return {
+        "id": user_id,
+        "displayName": f"MockUser{rng.randint(1000, 9999)}",
+        "bio": "这是一个模拟用户\n用于离线测试",
+        "pronouns": rng.choice(["", "he/him", "she/her", "they/them"]),
+        "statusDescription": "mock",
+        "status": rng.choice(STATUSES),
+        "tags": [rng.choice(TRUST_TAGS), "language_zho", "language_eng"],
+        "ageVerificationStatus": rng.choice(["hidden", "verified", "18+"]),
+        "ageVerified": rng.random() < 0.5,
+        "allowAvatarCopying": rng.random() < 0.5,
+        "date_joined": f"20{rng.randint(18, 24)}-01-01",
+        "userIcon": "",
+        "currentAvatarImageUrl": _file_url(avatar_file),
+        "currentAvatarThumbnailImageUrl": f"{IMAGE_HOST}/{avatar_file}/1/256",
+        "platform": rng.choice(PLATFORMS),
+        "last_platform": "standalonewindows",
+        "location": "offline",
+        "badges": [],
+    }
+
+
+def mock_world(world_id: str) -> Dict:
+    rng = _rng(world_id)
+    visits = rng.randint(100, 10_000_000)
+    return {
+        "id": world_id,
+        "name": f"Mock World {rng.randint(1, 999)}",
+        "authorId": f"usr_{_uuid(rng)}",
+        "authorName": f"MockAuthor{rng.randint(1, 99)}",
+        "description": "A world served by the local mock VRChat API.",
+        "capacity": 32,
+        "recommendedCapacity": 16,
+        "occupants": rng.randint(0, 200),
+        "visits": visits,
+        "favorites": rng.randint(0, visits // 10),
+        "heat": rng.randint(0, 5),
+        "popularity": rng.randint(0, 5),
+        "releaseStatus": "public",
+        "tags": ["system_approved", "author_tag_game", "author_tag_chill"],
+        "thumbnailImageUrl": f"{IMAGE_HOST}/file_{_uuid(rng)}/1/256",
+        "version": rng.randint(1, 60),
+        "created_at": _date(rng),
+        "updated_at": _date(rng),
+        "labsPublicationDate": _date(rng),
+        "publicationDate": _date(rng),
+        "unityPackages": [
+            {
+                "assetUrl": _file_url(f"file_{_uuid(rng)}"),
+                "platform": platform,
+                "unityVersion": "2022.3.22f1",
+            }
+            for platform in PLATFORMS[:2]
+        ],
+    }
+
+
+def mock_avatar(avatar_id: str) -> Dict:
+    rng = _rng(avatar_id)
+    packages = [
+        {
+            "platform": platform,
+            "unityVersion": "2022.3.22f1",
+            "performanceRating": rng.choice(["Excellent", "Good", "Medium", "Poor", "VeryPoor"]),
+        }
+        for platform in PLATFORMS
+    ]
+    packages.append({"platform": "standalonewindows", "unityVersion": "2022.3.22f1",
+                     "variant": "impostor", "impostorizerVersion": "0.17.0"})
+    return {
+        "id": avatar_id,
+        "name": f"Mock Avatar {rng.randint(1, 999)}",
+        "authorId": f"usr_{_uuid(rng)}",
+        "authorName": f"MockAuthor{rng.randint(1, 99)}",
+        "description": "A mock avatar.",
+        "thumbnailImageUrl": f"{IMAGE_HOST}/file_{_uuid(rng)}/1/256",
+        "version": rng.randint(1, 30),
+        "created_at": _date(rng),
+        "updated_at": _date(rng),
+        "unityPackages": packages,
+    }
+
+
+def mock_group(group_id: str) -> Dict:
+    rng = _rng(group_id)
+    member_count = rng.randint(1, 5000)
+    return {
+        "id": group_id,
+        "name": f"Mock Group {rng.randint(1, 999)}",
+        "shortCode": f"MOCK{rng.randint(0, 99)}",
+        "discriminator": f"{rng.randint(0, 9999):04d}",
+        "description": "A mock group.",
+        "rules": "1. be nice",
+        "ownerId": f"usr_{_uuid(rng)}",
+        "iconUrl": f"{IMAGE_HOST}/file_{_uuid(rng)}/1/128",
+        "bannerUrl": f"{IMAGE_HOST}/file_{_uuid(rng)}/1/512",
+        "joinState": rng.choice(["open", "request", "invite"]),
+        "languages": ["zho", "eng"],
+        "links": ["https://vrchat.com"],
+        "memberCount": member_count,
+        "onlineMemberCount": rng.randint(0, member_count),
+        "createdAt": _date(rng),
+    }
+
+
+def mock_group_roles(group_id: str) -> List[Dict]:
+    rng = _rng(f"{group_id}/roles")
+    names = ["Owner", "Moderator", "Event Host", "Member+"]
+    return [
+        {"id": f"grol_{_uuid(rng)}", "groupId": group_id, "name": name, "order": order}
+        for order, name in enumerate(names[:rng.randint(1, len(names))])
+    ]
+
+
+def mock_group_members(group_id: str, offset: int, n: int) -> List[Dict]:
+    """按加入顺序返回一页成员，总数与 mock_group 的 memberCount 一致；与 VRChat 一样 user 中不带 tags"""
+    roles = [role["id"] for role in mock_group_roles(group_id)]
+    members = []
+    for index in range(offset, min(offset + n, mock_group(group_id)["memberCount"])):
+        rng = _rng(f"{group_id}/members/{index}")
+        user_id = f"usr_{_uuid(rng)}"
+        members.append({
+            "id": f"gmem_{_uuid(rng)}",
+            "groupId": group_id,
+            "userId": user_id,
+            "isRepresenting": rng.random() < 0.3,
+            "user": {"id": user_id, "displayName": f"MockMember{index}"},
+            "roleIds": [role for role in roles if rng.random() < 0.1],
+            "joinedAt": _date(rng),
+            "membershipStatus": "member",
+        })
+    return members
+
+
+def mock_user_groups(user_id: str) -> List[Dict]:
+    rng = _rng(f"{user_id}/groups")
+    groups = []
+    for index in range(rng.randint(0, 5)):
+        group = mock_group(f"grp_{_uuid(rng)}")
+        groups.append({
+            "id": f"gmem_{_uuid(rng)}",
+            "groupId": group["id"],
+            "name": group["name"],
+            "iconId": None,
+            "iconUrl": group["iconUrl"],
+            "ownerId": group["ownerId"],
+            "memberCount": group["memberCount"],
+            "isRepresenting": index == 0,
+        })
+    return groups
+
+
+def mock_file(file_id: str) -> Dict:
+    rng = _rng(file_id)
+    return {
+        "id": file_id,
+        "name": f"Avatar - Mock Avatar {rng.randint(1, 999)} - Asset bundle - 2022.3.22f1_1_standalonewindows_Release",
+        "ownerId": f"usr_{_uuid(rng)}",
+        "mimeType": "application/x-avatar",
+        "versions": [
+            {"version": 0, "status": "complete"},
+            {"version": 1, "status": "complete",
+             "file": {"fileName": "asset.vrca", "sizeInBytes": rng.randint(1_000_000, 200_000_000)}},
+        ],
+    }
+
+
+def mock_friend(index: int) -> Dict:
+    rng = _rng(f"friend/{index}")
+    user = mock_user(f"usr_{_uuid(rng)}")
+    roll = rng.random()
+    if roll < 0.2:
+        location = "offline"
+    elif roll < 0.4:
+        location = "private"
+    else:
+        # 大约 12 个世界、少量实例，模拟好友扎堆的情况
+        world = f"wrld_{_uuid(_rng(f'world/{rng.randint(0, 11)}'))}"
+        access = rng.choice(["", "~hidden(usr_x)", "~friends(usr_x)", "~group(grp_x)~groupAccessType(public)"])
+        location = f"{world}:{rng.randint(10000, 10003)}{access}~region({rng.choice(REGIONS)})"
+    user["location"] = location
+    return user
+
+
+FRIENDS = [mock_friend(index) for index in range(FRIEND_COUNT)]
+
+
+def mock_instance(location: str) -> Dict:
+    """实例人数至少包含位于其中的模拟好友"""
+    world_id, _, instance_id = location.partition(":")
+    rng = _rng(location)
+    world = mock_world(world_id)
+    friends = sum(1 for friend in FRIENDS if friend["location"] == location)
+    user_count = min(world["capacity"], friends + rng.randint(0, 20))
+    region = instance_id.split("~region(", 1)[1].split(")", 1)[0] if "~region(" in instance_id else "us"
+    return {
+        "id": location,
+        "location": location,
+        "worldId": world_id,
+        "instanceId": instance_id,
+        "name": instance_id.split("~", 1)[0],
+        "type": "hidden" if "~hidden(" in instance_id else "public",
+        "region": region,
+        "userCount": user_count,
+        "n_users": user_count,
+        "capacity": world["capacity"],
+        "full": user_count >= world["capacity"],
+    }
+
+
+PIPELINE_EVENTS = ["friend-online", "friend-offline", "friend-location", "friend-active", "friend-update"]
+
+
+def mock_pipeline_events(count: int = 100, seed: str = "pipeline") -> List[Dict]:
+    """
+    生成一段确定性的 pipeline 好友事件流
+
+    每项为 {"delay": 与上一条的间隔秒数, "type": 事件类型, "content": JSON 字符串}，
+    与 VRChat 一样 content 是二次编码的 JSON。
+    """
+    rng = _rng(seed)
+    events = []
+    for _ in range(count):
+        friend = rng.choice(FRIENDS)
+        event_type = rng.choice(PIPELINE_EVENTS)
+        content: Dict = {"userId": friend["id"]}
+        if event_type in ("friend-online", "friend-location"):
+            world = f"wrld_{_uuid(_rng(f'world/{rng.randint(0, 11)}'))}"
+            instance = f"{rng.randint(10000, 10003)}~region({rng.choice(REGIONS)})"
+            content.update(user=friend, location=f"{world}:{instance}", worldId=world,
+                           instanceId=instance, platform="standalonewindows")
+        elif event_type == "friend-active":
+            content.update(user=friend, platform="web")
+        elif event_type == "friend-update":
+            content["user"] = dict(friend, statusDescription=f"mock {rng.randint(0, 99)}")
+        else:
+            content["platform"] = ""
+        events.append({
+            "delay": round(rng.uniform(0, 0.2), 3),
+            "type": event_type,
+            "content": json.dumps(content, ensure_ascii=False),
+        })
+    return events
+
+
+def load_pipeline_events(path: str) -> List[Dict]:
+    """读取录制的事件流（每行一个 JSON）"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+# 搜索接口: 实体类型 -> (id 前缀, 构造函数, 名称字段)
+SEARCHABLE = {
+    "users": ("usr", mock_user, "displayName"),
+    "worlds": ("wrld", mock_world, "name"),
+    "groups": ("grp", mock_group, "name"),
+}
+
+
+def mock_search(kind: str, term: str, n: int) -> List[Dict]:
+    """返回名称中包含搜索词的模拟结果"""
+    prefix, builder, name_key = SEARCHABLE[kind]
+    rng = _rng(f"search/{kind}/{term}")
+    results = []
+    for index in range(min(n, rng.randint(0, 8))):
+        entity = builder(f"{prefix}_{_uuid(rng)}")
+        entity[name_key] = f"{term} {entity[name_key]}"
+        results.append(entity)
+    return results
+
+
+class MockVRChatAPI:
+    """
+    VRChat API 模拟服务器
+
+    Args:
+        latency: 每个请求的基础延迟（秒）
+        jitter: 延迟的随机抖动上限（秒）
+        error_rate: 返回 500 的概率
+        rate_limit_rate: 返回 429 的概率
+        retry_after: 429 响应携带的 Retry-After（秒）
+        require_auth: 是否校验 auth cookie（pipeline 校验 authToken 参数）
+        pipeline_events: pipeline 回放的事件流，默认为 mock_pipeline_events()
+        pipeline_speed: 回放倍速，不大于 0 时不等待
+        pipeline_close: 回放结束后是否主动断开，用于测试重连
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit_rate: float = 0.0,
+        retry_after: int = 1,
+        require_auth: bool = True,
+        pipeline_events: Optional[List[Dict]] = None,
+        pipeline_speed: float = 1.0,
+        pipeline_close: bool = False,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.require_auth = require_auth
+        self.pipeline_events = mock_pipeline_events() if pipeline_events is None else pipeline_events
+        self.pipeline_speed = pipeline_speed
+        self.pipeline_close = pipeline_close
+        self.requests: Counter = Counter()
+
+    @classmethod
+    def from_env(cls) -> "MockVRChatAPI":
+        pipeline_file = os.getenv("MOCK_VRC_PIPELINE_FILE")
+        return cls(
+            latency=float(os.getenv("MOCK_VRC_LATENCY", "0.05")),
+            jitter=float(os.getenv("MOCK_VRC_JITTER", "0.02")),
+            error_rate=float(os.getenv("MOCK_VRC_ERROR_RATE", "0")),
+            rate_limit_rate=float(os.getenv("MOCK_VRC_RATE_LIMIT_RATE", "0")),
+            retry_after=int(os.getenv("MOCK_VRC_RETRY_AFTER", "1")),
+            pipeline_events=load_pipeline_events(pipeline_file) if pipeline_file else None,
+            pipeline_speed=float(os.getenv("MOCK_VRC_PIPELINE_SPEED", "1")),
+            pipeline_close=os.getenv("MOCK_VRC_PIPELINE_CLOSE", "0") == "1",
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] == "websocket":
+            await self.pipeline(scope, receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        headers = {k.decode().lower(): v.decode() for k, v in scope["headers"]}
+        query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        status, body, extra_headers = await self.handle(scope["method"], scope["path"], query, headers)
+
+        payload = json.dumps(body, ensure_ascii=False).encode()
+        response_headers = [(b"content-type", b"application/json"),
+                            (b"content-length", str(len(payload)).encode())]
+        response_headers += [(k.encode(), v.encode()) for k, v in extra_headers]
+        await send({"type": "http.response.start", "status": status, "headers": response_headers})
+        await send({"type": "http.response.body", "body": payload})
+
+    async def pipeline(self, scope, receive, send):
+        """回放 pipeline 事件流"""
+        if (await receive())["type"] != "websocket.connect":
+            return
+        query = {k: v[0] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+        if self.require_auth and query.get("authToken") != AUTH_COOKIE:
+            await send({"type": "websocket.accept"})
+            error = {"err": "authToken doesn't correspond with an active session"}
+            await send({"type": "websocket.send", "text": json.dumps(error)})
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        await send({"type": "websocket.accept"})
+        self.requests["pipeline"] += 1
+
+        disconnected = asyncio.ensure_future(self._wait_disconnect(receive))
+        try:
+            for event in self.pipeline_events:
+                delay = event.get("delay", 0) / self.pipeline_speed if self.pipeline_speed > 0 else 0
+                if delay > 0:
+                    await asyncio.wait({disconnected}, timeout=delay)
+                if disconnected.done():
+                    return
+                frame = {k: v for k, v in event.items() if k != "delay"}
+                await send({"type": "websocket.send", "text": json.dumps(frame, ensure_ascii=False)})
+            if self.pipeline_close:
+                await send({"type": "websocket.close", "code": 1000})
+                return
+            await disconnected
+        finally:
+            disconnected.cancel()
+
+    @staticmethod
+    async def _wait_disconnect(receive):
+        while (await receive())["type"] != "websocket.disconnect":
+            pass
+
+    async def handle(
+        self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str]
+    ) -> Tuple[int, object, List[Tuple[str, str]]]:
+        """处理一个请求，返回 (状态码, 响应体, 额外响应头)"""
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if not path.startswith(API_PREFIX):
+            return 404, {"error": {"message": "Not Found", "status_code": 404}}, []
+        endpoint = path[len(API_PREFIX):].strip("/")
+        self.requests[endpoint.split("/", 1)[0]] += 1
+
+        if self.rate_limit_rate and random.random() < self.rate_limit_rate:
+            return 429, {"error": {"message": "Too Many Requests", "status_code": 429}}, [
+                ("Retry-After", str(self.retry_after))]
+        if self.error_rate and random.random() < self.error_rate:
+            return 500, {"error": {"message": "Internal Server Error", "status_code": 500}}, []
+
+        if endpoint == "auth/user" and headers.get("authorization", "").startswith("Basic "):
+            return 200, self._current_user(), [
+                ("Set-Cookie", f"auth={AUTH_COOKIE}; Max-Age={AUTH_COOKIE_MAX_AGE}; Path=/; HttpOnly")]
+        if self.require_auth and f"auth={AUTH_COOKIE}" not in headers.get("cookie", ""):
+            return 401, {"error": {"message": "Missing Credentials", "status_code": 401}}, []
+
+        body = self.route(method, endpoint, query)
+        if body is None:
+            return 404, {"error": {"message": f"Not found: {endpoint}", "status_code": 404}}, []
+        return 200, body, []
+
+    def _current_user(self) -> Dict:
+        user = mock_user("usr_00000000-0000-4000-8000-000000000000")
+        user["friends"] = [friend["id"] for friend in FRIENDS]
+        return user
+
+    def route(self, method: str, endpoint: str, query: Dict[str, str]) -> Optional[object]:
+        """按端点返回模拟数据，None 表示 404"""
+        parts = endpoint.split("/")
+        if "dead" in endpoint:
+            return None
+        if parts == ["auth"]:
+            return {"ok": True, "token": AUTH_COOKIE}
+        if parts == ["auth", "user"]:
+            return self._current_user()
+        if parts == ["auth", "user", "friends"]:
+            offset = int(query.get("offset", 0))
+            n = min(int(query.get("n", 60)), 100)
+            offline = query.get("offline", "false").lower() == "true"
+            friends = [f for f in FRIENDS if (f["location"] == "offline") == offline]
+            return friends[offset:offset + n]
+        if len(parts) == 1 and parts[0] in SEARCHABLE:
+            term = query.get("search") or query.get("query") or ""
+            return mock_search(parts[0], term, min(int(query.get("n", 10)), 100))
+        if len(parts) == 2:
+            kind, entity_id = parts
+            builders = {
+                "users": mock_user,
+                "worlds": mock_world,
+                "avatars": mock_avatar,
+                "groups": mock_group,
+                "file": mock_file,
+                "instances": mock_instance,
+            }
+            builder = builders.get(kind)
+            return builder(entity_id) if builder else None
+        if len(parts) == 3 and parts[0] == "groups" and parts[2] == "members":
+            offset = int(query.get("offset", 0))
+            return mock_group_members(parts[1], offset, min(int(query.get("n", 60)), 100))
+        if len(parts) == 3 and parts[0] == "groups" and parts[2] == "roles":
+            return mock_group_roles(parts[1])
+        if len(parts) == 3 and parts[0] == "users" and parts[2] == "groups":
+            return mock_user_groups(parts[1])
+        if len(parts) == 4 and parts[0] == "users" and parts[2:] == ["groups", "represented"]:
+            groups = mock_user_groups(parts[1])
+            return groups[0] if groups else {}
+        return None
+
+
+app = MockVRChatAPI.from_env()
@@ -0,0 +1,182 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from mengluo_vrc_bot.services.log import logger
+
+DEFAULT_RETRY_AFTER = 10.0  # 429 未携带 Retry-After 时的暂停秒数
+
+# 端点首段 -> 限流分组
+ENDPOINT_FAMILIES = {
+    "users": "users",
+    "worlds": "worlds",
+    "instances": "worlds",
+    "avatars": "avatars",
+    "groups": "groups",
+    "file": "files",
+    "image": "files",
+    "auth": "auth",
+}
+
+
+class RateLimitTimeout(Exception):
+    """排队等待令牌超过最大时长"""
+    pass
+
+
+def parse_retry_after(value: Optional[str]) -> float:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回需要等待的秒数"""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return DEFAULT_RETRY_AFTER
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def endpoint_family(endpoint: str) -> str:
+    """根据端点路径获取限流分组"""
+    head = endpoint.lstrip("/").split("/", 1)[0].split("?", 1)[0]
+    return ENDPOINT_FAMILIES.get(head, "default")
+
+
+class TokenBucket:
+    """
+    令牌桶
+
+    说明:
+        等待者通过 asyncio.Lock（FIFO）排队，先到先得；
+        pause() 可在收到 429 后让整个桶暂停到 Retry-After 指定的时间。
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    def pause(self, seconds: float):
+        """暂停发放令牌，并清空已有令牌"""
+        now = time.monotonic()
+        self._paused_until = max(self._paused_until, now + seconds)
+        self._tokens = 0.0
+        self._updated = max(self._updated, self._paused_until)
+
+    @property
+    def paused_for(self) -> float:
+        """剩余暂停秒数"""
+        return max(self._paused_until - time.monotonic(), 0.0)
+
+    async def acquire(self, max_wait: Optional[float] = None):
+        """
+        获取一个令牌
+
+        Args:
+            max_wait: 最长排队秒数，None 表示不限
+
+        Raises:
+            RateLimitTimeout: 预计或实际等待超过 max_wait
+        """
+        deadline = None if max_wait is None else time.monotonic() + max_wait
+        try:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            await asyncio.wait_for(self._lock.acquire(), remaining)
+        except asyncio.TimeoutError:
+            raise RateLimitTimeout("排队等待超时")
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    wait = (1 - self._tokens) / self.rate
+                if deadline is not None and now + wait > deadline:
+                    raise RateLimitTimeout(f"预计需要等待 {wait:.1f} 秒")
+                await asyncio.sleep(wait)
+        finally:
+            self._lock.release()
+
+
+class RateLimiter:
+    """
+    按端点分组的限流器
+
+    说明:
+        scope 用于区分不同的限流主体（如多账号时的各个账号），
+        每个 scope 下的各分组拥有独立的令牌桶。
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: int,
+        max_wait: Optional[float] = None,
+        overrides: Optional[Dict[str, Tuple[float, int]]] = None,
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_wait = max_wait
+        self.overrides = overrides or {}
+        self._buckets: Dict[Tuple[str, str], TokenBucket] = {}
+
+    def bucket(self, family: str, scope: str = "") -> TokenBucket:
+        """获取（必要时创建）分组对应的令牌桶"""
+        bucket = self._buckets.get((scope, family))
+        if bucket is None:
+            rate, capacity = self.overrides.get(family, (self.rate, self.capacity))
+            bucket = self._buckets[(scope, family)] = TokenBucket(rate, capacity)
+        return bucket
+
+    async def acquire(self, endpoint: str, scope: str = ""):
+        """为端点获取一个令牌"""
+        await self.bucket(endpoint_family(endpoint), scope).acquire(self.max_wait)
+
+    def available(self, endpoint: str, scope: str = "") -> float:
+        """端点所在分组当前可用的令牌数，暂停中为 0"""
+        bucket = self.bucket(endpoint_family(endpoint), scope)
+        if bucket.paused_for > 0:
+            return 0.0
+        bucket._refill(time.monotonic())
+        return bucket._tokens
+
+    def pause(self, endpoint: str, retry_after: Optional[str], scope: str = "") -> float:
+        """收到 429 后暂停端点所在分组，返回暂停秒数"""
+        family = endpoint_family(endpoint)
+        seconds = parse_retry_after(retry_after)
+        self.bucket(family, scope).pause(seconds)
+        label = f"{scope}/{family}" if scope else family
+        logger.warning(f"VRChat API 限流({label})，暂停 {seconds:.1f} 秒")
+        return seconds
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """各分组的剩余令牌与暂停时间"""
+        result = {}
+        for (scope, family), bucket in self._buckets.items():
+            bucket._refill(time.monotonic())
+            result[f"{scope}/{family}" if scope else family] = {
+                "tokens": round(bucket._tokens, 2),
+                "paused_for": round(bucket.paused_for, 2),
+            }
+        return result
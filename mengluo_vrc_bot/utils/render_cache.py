@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import os
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import ujson
+
+from mengluo_vrc_bot.services.log import logger
+
+from .concurrency import SingleFlight
+
+IMAGE_SUFFIX = ".png"
+EVICT_RATIO = 0.9  # 超出预算时清理到预算的多少比例，避免每次写入都触发清理
+
+
+def template_version(*roots: Path) -> str:
+    """模板目录下所有文件（html、css、字体等）内容的哈希，模板修改后旧的缓存自然失效"""
+    digest = hashlib.sha256()
+    for root in roots:
+        for path in sorted(p for p in root.rglob("*") if p.is_file()):
+            digest.update(str(path.relative_to(root)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def render_key(version: str, template_name: str, template_data: Dict, pages: Dict) -> str:
+    """按模板版本、模板名、模板数据和页面参数计算缓存key"""
+    payload = ujson.dumps(
+        [version, template_name, template_data, pages],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RenderCache:
+    """
+    渲染结果缓存（按内容寻址）
+
+    说明:
+        key 为模板版本、模板名、模板数据和页面参数的哈希，数据相同就直接返回上次渲染的图片，
+        不再启动浏览器；数据变化后 key 随之变化，因此不需要TTL。
+        内存 LRU 和磁盘目录都按字节数限制大小，超出后淘汰最久未使用的图片；
+        磁盘命中时会更新文件修改时间，重启后按修改时间恢复使用顺序。
+        相同key的并发渲染只执行一次。
+
+    Args:
+        memory_budget: 内存中最多保存的字节数
+        disk_path: 磁盘缓存目录，None 表示只使用内存
+        disk_budget: 磁盘缓存最多占用的字节数
+    """
+
+    def __init__(self, memory_budget: int, disk_path: Optional[Path] = None, disk_budget: int = 0):
+        self.memory_budget = memory_budget
+        self.disk_budget = disk_budget
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()  # key -> 文件大小，按使用顺序
+        self._disk_size = 0
+        self._flight = SingleFlight()
+        self.path = disk_path
+        if disk_path is not None:
+            try:
+                self._load_index()
+            except OSError as e:
+                self.path = None
+                logger.error(f"初始化渲染缓存目录失败，仅使用内存: {e}")
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _file(self, key: str) -> Path:
+        return self.path / f"{key}{IMAGE_SUFFIX}"
+
+    def _load_index(self):
+        self.path.mkdir(parents=True, exist_ok=True)
+        files = []
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(f"{IMAGE_SUFFIX}.tmp"):
+                os.remove(entry.path)
+            elif entry.name.endswith(IMAGE_SUFFIX):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name[:-len(IMAGE_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(files):
+            self._disk[key] = size
+            self._disk_size += size
+        self._remove(self._evict_disk())
+
+    def _remember(self, key: str, image: bytes):
+        if len(image) > self.memory_budget:
+            return
+        if key not in self._memory:
+            self._memory_size += len(image)
+        self._memory[key] = image
+        self._memory.move_to_end(key)
+        while self._memory_size > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._file(key)
+        try:
+            image = path.read_bytes()
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return image
+
+    def _write(self, key: str, image: bytes):
+        path = self._file(key)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        tmp_path.write_bytes(image)
+        os.replace(tmp_path, path)
+
+    def _evict_disk(self) -> List[Path]:
+        """超出预算时移出最久未使用的文件，直到低于预算的 EVICT_RATIO，返回需要删除的文件"""
+        evicted = []
+        if self._disk_size <= self.disk_budget:
+            return evicted
+        while self._disk and self._disk_size > self.disk_budget * EVICT_RATIO:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            evicted.append(self._file(key))
+        return evicted
+
+    @staticmethod
+    def _remove(paths: List[Path]):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[bytes]:
+        image = self._memory.get(key)
+        if image is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return image
+        if self.path is not None and key in self._disk:
+            try:
+                image = await asyncio.to_thread(self._read, key)
+            except OSError as e:
+                logger.error(f"读取渲染缓存失败: {e}")
+            if image is None:
+                self._disk_size -= self._disk.pop(key, 0)
+            else:
+                self._disk.move_to_end(key)
+                self._remember(key, image)
+                self.disk_hits += 1
+                return image
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, image: bytes):
+        self._remember(key, image)
+        if self.path is None or len(image) > self.disk_budget:
+            return
+        try:
+            await asyncio.to_thread(self._write, key, image)
+        except OSError as e:
+            logger.error(f"写入渲染缓存失败: {e}")
+            return
+        self._disk_size += len(image) - self._disk.pop(key, 0)
+        self._disk[key] = len(image)
+        evicted = self._evict_disk()
+        if evicted:
+            try:
+                await asyncio.to_thread(self._remove, evicted)
+            except OSError as e:
+                logger.error(f"清理渲染缓存失败: {e}")
+
+    async def get_or_render(self, key: str, render: Callable[[], Awaitable[bytes]]) -> bytes:
+        """命中时直接返回缓存的图片，否则渲染并缓存；相同key的并发渲染只执行一次"""
+        image = await self.get(key)
+        if image is not None:
+            return image
+
+        async def load() -> bytes:
+            image = await render()
+            await self.put(key, image)
+            return image
+
+        return await self._flight.do(key, load)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_size,
+            "disk_entries": len(self._disk),
+            "disk_bytes": self._disk_size,
+        }
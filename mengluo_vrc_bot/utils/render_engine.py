@@ -0,0 +1,205 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Dict, List
+
+import jinja2
+from playwright.async_api import Browser, Page
+
+from mengluo_vrc_bot.services.log import logger
+
+DEVICE_SCALE_FACTOR = 2  # 与 template_to_pic 的默认值一致
+PRELOADED_STYLESHEETS = ("app.css", "static/flags.css")  # 各卡片共用、常驻页面的样式表
+PROBE_AFTER = 60.0  # 空闲超过该秒数的页面在使用前先探活
+PROBE_TIMEOUT = 5.0
+
+# 与模板一样不写 DOCTYPE，保持相同的排版模式
+SHELL_HTML = "<html><head>{}</head><body></body></html>".format(
+    "".join(f'<link rel="stylesheet" href="{href}"/>' for href in PRELOADED_STYLESHEETS)
+)
+
+# 在页面内解析卡片HTML，替换 body 和卡片自己的 head 节点（内联样式、额外的样式表），
+# 等待新增的样式表、图片和字体加载完成（最多 timeout 毫秒）
+SWAP_SCRIPT = """
+async ({html, preloaded, timeout}) => {
+    const doc = new DOMParser().parseFromString(html, "text/html");
+    document.querySelectorAll("[data-card]").forEach(node => node.remove());
+    const pending = [];
+    for (const node of doc.head.children) {
+        if (node.tagName === "LINK" && preloaded.includes(node.getAttribute("href"))) continue;
+        const copy = document.importNode(node, true);
+        copy.setAttribute("data-card", "");
+        if (copy.tagName === "LINK") pending.push(new Promise(resolve => { copy.onload = copy.onerror = resolve; }));
+        document.head.appendChild(copy);
+    }
+    document.body.replaceWith(document.importNode(doc.body, true));
+    window.scrollTo(0, 0);
+    for (const img of document.images) {
+        if (!img.complete) pending.push(new Promise(resolve => { img.onload = img.onerror = resolve; }));
+    }
+    pending.push(document.fonts.ready);
+    await Promise.race([Promise.all(pending), new Promise(resolve => setTimeout(resolve, timeout))]);
+}
+"""
+
+
+class PooledPage:
+    __slots__ = ("page", "uses", "last_used")
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.uses = 0
+        self.last_used = time.monotonic()
+
+
+class RenderEngine:
+    """
+    常驻页面池渲染
+
+    说明:
+        template_to_pic 每次都新开页面，重新解析 1MB 多的 app.css 和字体。
+        这里每个页面只在创建时加载一次 PRELOADED_STYLESHEETS，之后每次渲染只替换卡片的 DOM 再截图；
+        Jinja 模板编译后常驻内存，修改模板后需要重启。
+        页面使用 max_uses 次后关闭重建以限制内存，已关闭、浏览器断开或空闲过久且探活失败的页面会被丢弃，
+        渲染出错的页面同样丢弃，由调用方改用 template_to_pic。
+
+    Args:
+        browser: 返回浏览器实例的函数，与 template_to_pic 共用 nonebot_plugin_htmlrender 的浏览器
+        template_dir: 模板目录，样式表的相对路径以此为基准
+        pool_size: 页面数，同时最多进行的渲染数
+        max_uses: 每个页面最多渲染的次数
+        timeout: 等待资源加载和截图的最长秒数
+    """
+
+    def __init__(
+        self,
+        browser: Callable[[], Awaitable[Browser]],
+        template_dir: Path,
+        pool_size: int,
+        max_uses: int,
+        timeout: float,
+    ):
+        self.browser = browser
+        self.template_dir = template_dir.absolute()
+        self.base_url = f"{self.template_dir.as_uri()}/"
+        self.pool_size = pool_size
+        self.max_uses = max(max_uses, 1)
+        self.timeout = timeout
+        self.env = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(str(self.template_dir)),
+            enable_async=True,
+            auto_reload=False,
+        )
+        self._idle: List[PooledPage] = []
+        self._slots = asyncio.Semaphore(max(pool_size, 1))
+        self.renders = 0
+        self.created = 0
+        self.recycled = 0
+        self.discarded = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.pool_size > 0
+
+    async def _new_page(self) -> PooledPage:
+        browser = await self.browser()
+        page = await browser.new_page(device_scale_factor=DEVICE_SCALE_FACTOR)
+        try:
+            await page.goto(self.base_url)
+            await page.set_content(SHELL_HTML, wait_until="load", timeout=self.timeout * 1000)
+        except BaseException:
+            await self._close(page)
+            raise
+        self.created += 1
+        return PooledPage(page)
+
+    @staticmethod
+    async def _close(page: Page):
+        try:
+            await page.close()
+        except Exception:
+            pass
+
+    async def _discard(self, pooled: PooledPage):
+        self.discarded += 1
+        await self._close(pooled.page)
+
+    async def _healthy(self, pooled: PooledPage) -> bool:
+        page = pooled.page
+        browser = page.context.browser
+        if page.is_closed() or (browser is not None and not browser.is_connected()):
+            return False
+        if time.monotonic() - pooled.last_used < PROBE_AFTER:
+            return True
+        try:
+            await asyncio.wait_for(page.evaluate("1"), PROBE_TIMEOUT)
+            return True
+        except Exception:
+            return False
+
+    @asynccontextmanager
+    async def _page(self) -> AsyncIterator[Page]:
+        async with self._slots:
+            pooled = None
+            while self._idle:
+                candidate = self._idle.pop()
+                if await self._healthy(candidate):
+                    pooled = candidate
+                    break
+                await self._discard(candidate)
+            if pooled is None:
+                pooled = await self._new_page()
+            try:
+                yield pooled.page
+            except BaseException:
+                await self._discard(pooled)
+                raise
+            pooled.uses += 1
+            pooled.last_used = time.monotonic()
+            if pooled.uses >= self.max_uses:
+                self.recycled += 1
+                await self._close(pooled.page)
+            else:
+                self._idle.append(pooled)
+
+    async def render(self, template_name: str, template_data: Dict, width: int, height: int) -> bytes:
+        """渲染模板为 png 图片，参数与 template_to_pic 的 viewport 一致"""
+        html = await self.env.get_template(template_name).render_async(**template_data)
+        async with self._page() as page:
+            await page.set_viewport_size({"width": width, "height": height})
+            await page.evaluate(
+                SWAP_SCRIPT,
+                {"html": html, "preloaded": list(PRELOADED_STYLESHEETS), "timeout": self.timeout * 1000},
+            )
+            image = await page.screenshot(full_page=True, type="png", timeout=self.timeout * 1000)
+        self.renders += 1
+        return image
+
+    async def warm(self):
+        """启动时预先创建页面，失败时只记录日志，之后按需创建"""
+        if not self.enabled:
+            return
+        results = await asyncio.gather(
+            *(self._new_page() for _ in range(self.pool_size - len(self._idle))),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, PooledPage):
+                self._idle.append(result)
+            else:
+                logger.warning(f"预热渲染页面失败: {result}")
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for pooled in idle:
+            await self._close(pooled.page)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "renders": self.renders,
+            "idle": len(self._idle),
+            "created": self.created,
+            "recycled": self.recycled,
+            "discarded": self.discarded,
+        }
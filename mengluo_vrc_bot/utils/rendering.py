@@ -1,30 +1,54 @@
+import asyncio
 import re
 import pytz
 
 from nonebot import require
-from dataclasses import dataclass
+from collections import Counter
+from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
-from typing import Dict, List, Optional, Union, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Union, Tuple
 from urllib.parse import urlparse
 
+from mengluo_vrc_bot.config.settings import settings
 from mengluo_vrc_bot.services.log import logger
-from mengluo_vrc_bot.config.path import TEMPLATE_PATH
+from mengluo_vrc_bot.services.presence import presence
+from mengluo_vrc_bot.config.path import DATA_PATH, TEMPLATE_PATH
 
-from .vrchat_utils import VRChatAPI
+from .render_cache import RenderCache, render_key, template_version
+from .render_engine import RenderEngine
+from .vrchat_location import Location, parse_location
+from .vrchat_models import Friend, GroupMember, Instance, UnityPackage, UserGroup, World
+from .vrchat_utils import VRChatAPI, VRChatAPIError, data_as_of, reset_data_as_of
 
 require("nonebot_plugin_htmlrender")
-from nonebot_plugin_htmlrender import template_to_pic
+from nonebot_plugin_htmlrender import get_browser, template_to_pic
 
 # 常量定义
 FILE_ID_PATTERN = re.compile(r"file_[a-zA-Z0-9-]+")
+FILE_VERSION_PATTERN = re.compile(r"file_[a-zA-Z0-9-]+/(\d+)")
+DEFAULT_FILE_VERSION = 1
 AUTHOR_TAG_PATTERN = re.compile(r'author_tag_')
-LOCATION_PATTERN = r'wrld_([0-9a-f]{8}-(?:[0-9a-f]{4}-){3}[0-9a-f]{12}):(\d+)(?:.*?~(group|hidden|friends)\()?.*?~region\(([a-z]{2})\)'
 LANGUAGE_PATTERN = r'language_(\w+)'
 DEFAULT_AVATAR_FILE_ID = "file_0e8c4e32-7444-44ea-ade4-313c010d4bae"
 BEIJING_TZ = pytz.timezone('Asia/Shanghai')
+RENDER_CACHE_DIR = DATA_PATH / "render_cache"
+MB = 1024 * 1024
 
 vrchat = VRChatAPI()
+render_cache = RenderCache(
+    settings.vrc_render_cache_memory_mb * MB,
+    RENDER_CACHE_DIR if settings.vrc_render_cache_disk_mb > 0 else None,
+    settings.vrc_render_cache_disk_mb * MB,
+)
+render_engine = RenderEngine(
+    get_browser,
+    TEMPLATE_PATH / "vrchat",
+    settings.vrc_render_pool_size,
+    settings.vrc_render_page_max_uses,
+    settings.vrc_render_timeout,
+)
+_template_version: Optional[str] = None
 
 # 平台映射
 class Platform(Enum):
@@ -53,6 +77,9 @@ CONTENT_TAG_MAP = {
     "content_adult": "成人内容"
 }
 
+UNKNOWN_TRUST = "未知"
+UNKNOWN_TRUST_COLOR = "rgb(144, 147, 153)"
+
 STATUS_MAP = {
     'active': 'online',
     'join me': 'joinme',
@@ -116,6 +143,26 @@ class PlatformStatus:
     ios: Union[str, float] = ""
 
 
+@dataclass
+class GroupMemberStats:
+    """群组成员统计数据类，成员逐个累加到计数器中，不保留成员列表"""
+    total: int = 0
+    trust: Counter = field(default_factory=Counter)  # 信任等级 -> 人数
+    join_years: Counter = field(default_factory=Counter)  # 加入年份 -> 人数
+    roles: Counter = field(default_factory=Counter)  # 身份组id -> 人数
+    no_role: int = 0
+
+    def add(self, member: GroupMember, tags: Optional[List[str]]):
+        self.total += 1
+        self.trust[get_trust_level(tags)[1] if tags else UNKNOWN_TRUST] += 1
+        year = member.joined_at[:4]
+        self.join_years[year if year.isdigit() else "-"] += 1
+        if member.role_ids:
+            self.roles.update(member.role_ids)
+        else:
+            self.no_role += 1
+
+
 def format_date_sync(date_str: str) -> str:
     """同步版本的日期格式化函数"""
     if date_str == "none":
@@ -129,6 +176,14 @@ def format_date_sync(date_str: str) -> str:
         return "-"
 
 
+def format_data_as_of() -> Optional[str]:
+    """本次渲染使用了过期缓存时，返回其数据时间"""
+    timestamp = data_as_of()
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, BEIJING_TZ).strftime("%Y-%m-%d %H:%M")
+
+
 async def format_date(date_str: str) -> str:
     """异步版本的日期格式化函数（保持向后兼容）"""
     return format_date_sync(date_str)
@@ -140,6 +195,12 @@ def extract_file_id(url: str) -> Optional[str]:
     return match.group(0) if match else None
 
 
+def extract_file_version(url: str) -> int:
+    """从URL中提取文件版本号，URL中没有版本号时返回默认版本"""
+    match = FILE_VERSION_PATTERN.search(url)
+    return int(match.group(1)) if match else DEFAULT_FILE_VERSION
+
+
 def calculate_ratio(numerator: int, denominator: int, precision: int = 2) -> float:
     """计算比率，安全处理除零情况"""
     return round((numerator / denominator) * 100, precision) if denominator > 0 else 0
@@ -188,31 +249,31 @@ async def process_avatar_info(avatar_image_url: str, user_id: str) -> AvatarInfo
         file_id = extract_file_id(avatar_image_url)
         if file_id and file_id != DEFAULT_AVATAR_FILE_ID:
             avatar_info.avatar_status = True
-            file_info = await vrchat.get_file_info(file_id)
-            avatar_info.avatar_name = file_info["name"].split("-")[1].strip()
-            avatar_info.avatar_is_owned = (file_info["ownerId"] == user_id)
+            file_meta = await vrchat.get_file_meta(file_id, extract_file_version(avatar_image_url))
+            avatar_info.avatar_name = file_meta.name.split("-")[1].strip()
+            avatar_info.avatar_is_owned = (file_meta.owner_id == user_id)
     except Exception as e:
         logger.error(f"处理头像信息失败: {str(e)}")
 
     return avatar_info
 
 
-def process_user_groups(groups_info: List[Dict], user_id: str) -> Tuple[int, bool, GroupData]:
+def process_user_groups(groups_info: List[UserGroup], user_id: str) -> Tuple[int, bool, GroupData]:
     """处理用户组信息"""
     groups_count = len(groups_info)
-    representing_group = next((group for group in groups_info if group['isRepresenting']), None)
+    representing_group = next((group for group in groups_info if group.is_representing), None)
     group_status = bool(representing_group)
 
     group_data = GroupData()
     if representing_group:
-        iconId = representing_group['iconId']
+        iconId = representing_group.icon_id
         if iconId:
             group_data.group_image = f"https://api.vrchat.cloud/api/1/image/{iconId}/1/128"
         else:
-            group_data.group_image = representing_group['iconUrl']
-        group_data.group_is_owned = True if representing_group['ownerId'] == user_id else False
-        group_data.group_memberCount = representing_group.get('memberCount', "")
-        group_data.group_name = representing_group.get('name', "")
+            group_data.group_image = representing_group.icon_url
+        group_data.group_is_owned = True if representing_group.owner_id == user_id else False
+        group_data.group_memberCount = representing_group.member_count
+        group_data.group_name = representing_group.name
 
     return groups_count, group_status, group_data
 
@@ -225,21 +286,26 @@ def calculate_layout_height(text: str, line_threshold: int = 5,
     return short_height, "350px"
 
 
-async def process_unity_packages_for_world(unity_packages: List[Dict]) -> Tuple[PlatformStatus, str]:
+async def process_unity_packages_for_world(unity_packages: List[UnityPackage]) -> Tuple[PlatformStatus, str]:
     """处理世界的Unity包信息"""
     world_status = PlatformStatus()
     platforms = []
 
-    for package in unity_packages:
-        file_id = extract_file_id(package['assetUrl'])
-        if not file_id:
-            continue
+    packages = [package for package in unity_packages if extract_file_id(package.asset_url)]
+    # 同一文件版本的元数据只会请求一次，之后永久从本地读取
+    file_metas = await asyncio.gather(
+        *(vrchat.get_file_meta(extract_file_id(package.asset_url), extract_file_version(package.asset_url))
+          for package in packages),
+        return_exceptions=True,
+    )
 
+    for package, file_meta in zip(packages, file_metas):
         try:
-            file_info = await vrchat.get_file_info(file_id)
-            file_size_mb = round(file_info['versions'][1]['file']['sizeInBytes'] / (1024 * 1024), 2)
-            platform = package['platform']
-            unity_version = package['unityVersion']
+            if isinstance(file_meta, BaseException):
+                raise file_meta
+            file_size_mb = round(file_meta.size_in_bytes / (1024 * 1024), 2)
+            platform = package.platform
+            unity_version = package.unity_version
 
             platform_display = PLATFORM_DISPLAY_MAP.get(platform, platform)
             platforms.append(f"{platform_display}/{unity_version}")
@@ -256,20 +322,20 @@ async def process_unity_packages_for_world(unity_packages: List[Dict]) -> Tuple[
     return world_status, ",".join(platforms)
 
 
-def process_unity_packages_for_avatar(unity_packages: List[Dict]) -> Tuple[PlatformStatus, str, str]:
+def process_unity_packages_for_avatar(unity_packages: List[UnityPackage]) -> Tuple[PlatformStatus, str, str]:
     """处理模型的Unity包信息"""
     avatar_status = PlatformStatus()
     platforms = []
     impostor_version = ""
 
     for package in unity_packages:
-        if package.get('variant') == "impostor":
-            impostor_version = package.get('impostorizerVersion', "")
+        if package.variant == "impostor":
+            impostor_version = package.impostorizer_version
             continue
 
-        platform = package['platform']
-        unity_version = package['unityVersion']
-        performance_rating = package.get('performanceRating', '')
+        platform = package.platform
+        unity_version = package.unity_version
+        performance_rating = package.performance_rating
 
         platform_display = PLATFORM_DISPLAY_MAP.get(platform, platform)
         platforms.append(f"{platform_display}/{unity_version}")
@@ -284,67 +350,97 @@ def process_unity_packages_for_avatar(unity_packages: List[Dict]) -> Tuple[Platf
     return avatar_status, ",".join(platforms), impostor_version
 
 
+async def render_card(template_name: str, template_data: Dict, width: int, height: int) -> bytes:
+    """
+    渲染 vrchat 目录下的模板
+
+    说明:
+        模板数据、尺寸和模板文件都与之前某次渲染相同时直接返回缓存的图片，不再启动浏览器。
+        未命中时使用常驻页面池渲染，页面池关闭或出错时改用 template_to_pic。
+        模板文件的版本在第一次渲染时计算，修改模板后需要重启才会生效。
+    """
+    global _template_version
+    pages = {
+        "viewport": {"width": width, "height": height},
+        "base_url": f"file://{TEMPLATE_PATH}"
+    }
+
+    async def render() -> bytes:
+        if render_engine.enabled:
+            try:
+                return await render_engine.render(template_name, template_data, width, height)
+            except Exception as e:
+                logger.warning(f"页面池渲染失败，改用 template_to_pic: {e}")
+        return await template_to_pic(
+            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
+            template_name=template_name,
+            templates=template_data,
+            pages=pages,
+        )
+
+    if not settings.vrc_render_cache_enabled:
+        return await render()
+    if _template_version is None:
+        _template_version = await asyncio.to_thread(template_version, TEMPLATE_PATH)
+    return await render_cache.get_or_render(render_key(_template_version, template_name, template_data, pages), render)
+
+
 async def render_userinfo(user_id: str) -> Union[bytes, str]:
     """渲染用户信息"""
     try:
-        user_info = await vrchat.get_user(user_id)
-        if type(user_info) == str:
-            return user_info
+        reset_data_as_of()
+        try:
+            user_info = await vrchat.get_user(user_id)
+        except VRChatAPIError as e:
+            return str(e)
 
         # 处理用户组信息
         groups_info = await vrchat.get_user_groups(user_id)
         groups_count, group_status, group_data = process_user_groups(groups_info, user_id)
 
         # 处理信任等级
-        known, know_description, _ = get_trust_level(user_info['tags'])
+        known, know_description, _ = get_trust_level(user_info.tags)
 
-        languages = get_languages(user_info['tags'])
+        languages = get_languages(user_info.tags)
 
         # 处理头像信息
-        avatar_info = await process_avatar_info(user_info['currentAvatarImageUrl'], user_id)
+        avatar_info = await process_avatar_info(user_info.current_avatar_image_url, user_id)
 
         # 计算布局高度
-        height, min_height = calculate_layout_height(user_info['bio'])
+        height, min_height = calculate_layout_height(user_info.bio)
 
         # 准备模板数据
         template_data = {
-            "ageVerificationStatus": user_info['ageVerificationStatus'],
-            "ageVerified": user_info['ageVerified'],
+            "ageVerificationStatus": user_info.age_verification_status,
+            "ageVerified": user_info.age_verified,
             "known": known,
             "known_description": know_description,
-            "allowAvatarCopying": user_info['allowAvatarCopying'],
-            "displayName": user_info['displayName'],
-            "date_joined": user_info['date_joined'],
-            "userIcon": user_info['userIcon'] or user_info['currentAvatarThumbnailImageUrl'],
-            "bio": user_info['bio'],
-            "pronouns": user_info['pronouns'],
-            "status_description": user_info['statusDescription'],
-            "platform": user_info['platform'] or user_info.get('last_platform'),
+            "allowAvatarCopying": user_info.allow_avatar_copying,
+            "displayName": user_info.display_name,
+            "date_joined": user_info.date_joined,
+            "userIcon": user_info.icon,
+            "bio": user_info.bio,
+            "pronouns": user_info.pronouns,
+            "status_description": user_info.status_description,
+            "platform": user_info.platform or user_info.last_platform,
             "id": user_id,
             "avatar_name": avatar_info.avatar_name,
             "avatar_status": avatar_info.avatar_status,
             "avatar_is_owned": avatar_info.avatar_is_owned,
-            "groups_info": groups_info,
+            "groups_info": [group.to_dict() for group in groups_info],
             "groups_count": groups_count,
             "group_status": group_status,
             "group_image": group_data.group_image,
             "group_memberCount": group_data.group_memberCount,
             "group_name": group_data.group_name,
             "group_is_owned": group_data.group_is_owned,
-            "badges": user_info['badges'],
+            "badges": [badge.to_dict() for badge in user_info.badges],
             "min_height": min_height,
-            "languages": languages
+            "languages": languages,
+            "data_as_of": format_data_as_of(),
         }
 
-        return await template_to_pic(
-            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
-            template_name="user.html",
-            templates=template_data,
-            pages={
-                "viewport": {"width": 850, "height": height},
-                "base_url": f"file://{TEMPLATE_PATH}"
-            },
-        )
+        return await render_card("user.html", template_data, 850, height)
     except Exception as e:
         logger.error(f"渲染用户信息失败: {str(e)}")
         return "渲染用户信息失败"
@@ -353,55 +449,57 @@ async def render_userinfo(user_id: str) -> Union[bytes, str]:
 async def render_worldinfo(world_id: str) -> Union[bytes, str]:
     """渲染世界信息"""
     try:
-        world_info = await vrchat.get_world(world_id)
-        if type(world_info) == str:
-            return world_info
+        reset_data_as_of()
+        try:
+            world_info = await vrchat.get_world(world_id)
+        except VRChatAPIError as e:
+            return str(e)
 
         # 处理日期
-        created_at = format_date_sync(world_info['created_at'])
-        updated_at = format_date_sync(world_info['updated_at'])
-        labs_publication_date = format_date_sync(world_info['labsPublicationDate'])
-        publication_date = format_date_sync(world_info['publicationDate'])
+        created_at = format_date_sync(world_info.created_at)
+        updated_at = format_date_sync(world_info.updated_at)
+        labs_publication_date = format_date_sync(world_info.labs_publication_date)
+        publication_date = format_date_sync(world_info.publication_date)
 
         # 处理标签
-        tags = world_info['tags']
+        tags = world_info.tags
         content_tags = process_content_tags(tags)
         author_tags = process_author_tags(tags)
 
         # 检查实验室状态
-        release_status = "lab" if "system_labs" in tags else world_info['releaseStatus']
+        release_status = "lab" if "system_labs" in tags else world_info.release_status
 
         # 处理Unity包
-        world_status, world_platforms = await process_unity_packages_for_world(world_info['unityPackages'])
+        world_status, world_platforms = await process_unity_packages_for_world(world_info.unity_packages)
 
         # 计算统计数据
-        visits = world_info['visits']
-        favorites = world_info['favorites']
+        visits = world_info.visits
+        favorites = world_info.favorites
         ratio_favorite = calculate_ratio(favorites, visits)
 
-        heat = world_info['heat']
-        popularity = world_info['popularity']
+        heat = world_info.heat
+        popularity = world_info.popularity
         heat_display = f"{heat}{'🔥' * heat}"
         popularity_display = f"{popularity}{'💖' * popularity}"
 
         template_data = {
             "id": world_id,
-            "authorName": world_info['authorName'],
-            "capacity": world_info['capacity'],
+            "authorName": world_info.author_name,
+            "capacity": world_info.capacity,
             "created_at": created_at,
-            "description": world_info['description'],
+            "description": world_info.description,
             "favorites": favorites,
             "heat": heat_display,
             "labsPublicationDate": labs_publication_date,
-            "name": world_info['name'],
-            "occupants": world_info['occupants'],
+            "name": world_info.name,
+            "occupants": world_info.occupants,
             "popularity": popularity_display,
             "publicationDate": publication_date,
-            "recommendedCapacity": world_info['recommendedCapacity'],
+            "recommendedCapacity": world_info.recommended_capacity,
             "releaseStatus": release_status,
-            "thumbnailImageUrl": world_info['thumbnailImageUrl'],
+            "thumbnailImageUrl": world_info.thumbnail_image_url,
             "updated_at": updated_at,
-            "version": world_info['version'],
+            "version": world_info.version,
             "visits": visits,
             "ratio_favorite": ratio_favorite,
             "authorTags": author_tags,
@@ -409,18 +507,11 @@ async def render_worldinfo(world_id: str) -> Union[bytes, str]:
             "world_pc": world_status.pc,
             "world_android": world_status.android,
             "world_ios": world_status.ios,
-            "world_platforms": world_platforms
+            "world_platforms": world_platforms,
+            "data_as_of": format_data_as_of(),
         }
 
-        return await template_to_pic(
-            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
-            template_name="world.html",
-            templates=template_data,
-            pages={
-                "viewport": {"width": 850, "height": 510},
-                "base_url": f"file://{TEMPLATE_PATH}"
-            }
-        )
+        return await render_card("world.html", template_data, 850, 510)
     except Exception as e:
         logger.error(f"渲染地图信息失败: {str(e)}")
         return "渲染地图信息失败"
@@ -429,48 +520,43 @@ async def render_worldinfo(world_id: str) -> Union[bytes, str]:
 async def render_avatarinfo(avatar_id: str) -> Union[bytes, str]:
     """渲染模型信息"""
     try:
-        avatar_info = await vrchat.get_avatar(avatar_id)
-        if type(avatar_info) == str:
-            return avatar_info
+        reset_data_as_of()
+        try:
+            avatar_info = await vrchat.get_avatar(avatar_id)
+        except VRChatAPIError as e:
+            return str(e)
 
         # 处理日期
-        created_at = format_date_sync(avatar_info['created_at'])
-        updated_at = format_date_sync(avatar_info['updated_at'])
+        created_at = format_date_sync(avatar_info.created_at)
+        updated_at = format_date_sync(avatar_info.updated_at)
 
         # 处理Unity包
         avatar_status, avatar_platforms, avatar_impostor = process_unity_packages_for_avatar(
-            avatar_info['unityPackages']
+            avatar_info.unity_packages
         )
 
         # 根据描述长度调整高度
-        description = avatar_info['description']
+        description = avatar_info.description
         height = 420 if len(description) >= 100 else 340
 
         template_data = {
             "id": avatar_id,
-            "authorName": avatar_info['authorName'],
+            "authorName": avatar_info.author_name,
             "created_at": created_at,
             "description": description,
-            "name": avatar_info['name'],
+            "name": avatar_info.name,
             "updated_at": updated_at,
-            "version": avatar_info['version'],
-            "thumbnailImageUrl": avatar_info['thumbnailImageUrl'],
+            "version": avatar_info.version,
+            "thumbnailImageUrl": avatar_info.thumbnail_image_url,
             "avatar_pc": avatar_status.pc,
             "avatar_android": avatar_status.android,
             "avatar_ios": avatar_status.ios,
             "avatar_platforms": avatar_platforms,
-            "avatar_impostor": avatar_impostor
+            "avatar_impostor": avatar_impostor,
+            "data_as_of": format_data_as_of(),
         }
 
-        return await template_to_pic(
-            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
-            template_name="avatar.html",
-            templates=template_data,
-            pages={
-                "viewport": {"width": 850, "height": height},
-                "base_url": f"file://{TEMPLATE_PATH}"
-            }
-        )
+        return await render_card("avatar.html", template_data, 850, height)
     except Exception as e:
         logger.error(f"渲染模型信息失败: {str(e)}")
         return "渲染模型信息失败"
@@ -479,31 +565,35 @@ async def render_avatarinfo(avatar_id: str) -> Union[bytes, str]:
 async def render_groupinfo(group_id: str) -> Union[bytes, str]:
     """渲染群组信息"""
     try:
-        group_info = await vrchat.get_group(group_id)
-        if type(group_info) == str:
-            return group_info
+        reset_data_as_of()
+        try:
+            group_info = await vrchat.get_group(group_id)
+        except VRChatAPIError as e:
+            return str(e)
 
         # 处理日期
-        created_at = format_date_sync(group_info['createdAt'])
+        created_at = format_date_sync(group_info.created_at)
         
         group_languages = []
-        for language in group_info['languages']:
+        for language in group_info.languages:
             group_languages.append(LANGUAGE_MAP.get(language, language))
 
         # 获取群主信息
-        owner_info = await vrchat.get_user(group_info['ownerId'])
-        owner_name = owner_info["displayName"] if owner_info else "Unknown"
+        try:
+            owner_name = (await vrchat.get_user(group_info.owner_id)).display_name
+        except VRChatAPIError:
+            owner_name = "Unknown"
 
         # 处理链接图标
-        links = group_info.get("links", [])
+        links = group_info.links
         link_icons = [
             f"https://icons.duckduckgo.com/ip2/{urlparse(link).netloc.split(':')[0]}.ico"
             for link in links
         ]
 
         # 处理规则
-        rules = group_info['rules'] or "-"
-        description = group_info['description']
+        rules = group_info.rules or "-"
+        description = group_info.description
 
         # 根据内容长度调整高度
         content_is_long = (len(description) > 100 or
@@ -512,106 +602,214 @@ async def render_groupinfo(group_id: str) -> Union[bytes, str]:
         height = 750 if content_is_long else 570
 
         # 生成群组代码
-        group_code = f"{group_info['shortCode']}.{group_info['discriminator']}"
+        group_code = f"{group_info.short_code}.{group_info.discriminator}"
 
         template_data = {
             "id": group_id,
-            "bannerUrl": group_info['bannerUrl'],
+            "bannerUrl": group_info.banner_url,
             "createdAt": created_at,
             "description": description,
-            "iconUrl": group_info['iconUrl'],
-            "joinState": group_info['joinState'],
-            "memberCount": group_info['memberCount'],
-            "name": group_info['name'],
-            "onlineMemberCount": group_info['onlineMemberCount'],
+            "iconUrl": group_info.icon_url,
+            "joinState": group_info.join_state,
+            "memberCount": group_info.member_count,
+            "name": group_info.name,
+            "onlineMemberCount": group_info.online_member_count,
             "owner": owner_name,
             "rules": rules,
             "groupCode": group_code,
             "links": link_icons,
             "group_languages": group_languages,
+            "data_as_of": format_data_as_of(),
         }
 
-        return await template_to_pic(
-            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
-            template_name="group.html",
-            templates=template_data,
-            pages={
-                "viewport": {"width": 850, "height": height},
-                "base_url": f"file://{TEMPLATE_PATH}"
-            }
-        )
+        return await render_card("group.html", template_data, 850, height)
     except Exception as e:
         logger.error(f"渲染群组信息失败: {str(e)}")
         return "渲染群组信息失败"
 
+def known_member_tags(member: GroupMember) -> Optional[List[str]]:
+    """
+    获取成员的用户标签（用于信任等级）
+
+    说明:
+        成员接口一般不返回标签，依次尝试好友状态表和内存中缓存的用户资料，不额外发送请求。
+    """
+    if member.tags:
+        return member.tags
+    friend = presence.get(member.user_id)
+    if friend is not None and friend.tags:
+        return friend.tags
+    user = vrchat.peek_user(member.user_id)
+    return user.tags if user is not None and user.tags else None
+
+
+def build_bars(counts: List[Tuple[str, int]], total: int, labels: Optional[Dict[str, str]] = None,
+               colors: Optional[Dict[str, str]] = None) -> List[Dict]:
+    """把计数整理为柱状条数据"""
+    labels = labels or {}
+    colors = colors or {}
+    return [
+        {
+            "label": labels.get(key, key),
+            "count": count,
+            "percent": calculate_ratio(count, total, 1),
+            "color": colors.get(key, ""),
+        }
+        for key, count in counts
+    ]
+
+
+async def render_group_members(group_id: str) -> Union[bytes, str]:
+    """渲染群组成员统计"""
+    try:
+        reset_data_as_of()
+        try:
+            group_info = await vrchat.get_group(group_id)
+        except VRChatAPIError as e:
+            return str(e)
+
+        try:
+            role_names = {role.id: role.name for role in await vrchat.get_group_roles(group_id)}
+        except VRChatAPIError:
+            role_names = {}
+
+        # 边分页边统计，内存占用与成员数无关
+        stats = GroupMemberStats()
+        partial = False
+        try:
+            async for member in vrchat.iter_group_members(group_id, limit=settings.vrc_group_members_max):
+                stats.add(member, known_member_tags(member))
+        except VRChatAPIError as e:
+            if not stats.total:
+                return str(e)
+            logger.warning(f"获取群组 {group_id} 成员中断，仅统计已获取的部分: {e}")
+            partial = True
+
+        trust_colors = {description: color for _, _, description, color in TRUST_LEVELS}
+        trust_colors["Visitor"] = get_trust_level([])[2]
+        trust_colors[UNKNOWN_TRUST] = UNKNOWN_TRUST_COLOR
+        trust_order = [description for _, _, description, _ in TRUST_LEVELS] + ["Visitor", UNKNOWN_TRUST]
+        trust = build_bars(
+            [(key, stats.trust[key]) for key in trust_order if stats.trust[key]],
+            stats.total,
+            colors=trust_colors,
+        )
+        join_years = build_bars(sorted(stats.join_years.items()), stats.total)
+        roles = build_bars(stats.roles.most_common(10), stats.total, labels=role_names)
+        if stats.no_role:
+            roles += build_bars([("无身份组", stats.no_role)], stats.total)
+
+        template_data = {
+            "name": group_info.name,
+            "iconUrl": group_info.icon_url,
+            "groupCode": f"{group_info.short_code}.{group_info.discriminator}",
+            "memberCount": group_info.member_count,
+            "counted": stats.total,
+            "partial": partial or stats.total < group_info.member_count,
+            "trust": trust,
+            "join_years": join_years,
+            "roles": roles,
+            "data_as_of": format_data_as_of(),
+        }
+        height = 220 + 28 * (len(trust) + len(join_years) + len(roles))
+
+        return await render_card("group_members.html", template_data, 650, height)
+    except Exception as e:
+        logger.error(f"渲染群组成员统计失败: {str(e)}")
+        return "渲染群组成员统计失败"
+
+
+async def iter_friends(offline: bool, limit: int) -> AsyncIterator[Friend]:
+    """优先使用 pipeline 维护的好友状态表，未就绪（未启用或正在重连）时分页请求API"""
+    if presence.ready:
+        for friend in presence.friends(offline, limit):
+            yield friend
+        return
+    async for friend in vrchat.iter_friends(offline=offline, limit=limit):
+        yield friend
+
+
+def build_instance_cards(
+    instances: Dict[str, List[Dict]],
+    locations: Dict[str, Location],
+    worlds: Dict[str, Union[World, VRChatAPIError]],
+    occupancy: Dict[str, Union[Instance, VRChatAPIError]],
+) -> List[Dict]:
+    """把按实例分组的好友整理为实例卡片，同一实例好友多的排在前面"""
+    cards = []
+    for key, members in instances.items():
+        location = locations[key]
+        world = worlds.get(location.world_id)
+        world = None if isinstance(world, VRChatAPIError) else world
+        instance = occupancy.get(key)
+        instance = None if isinstance(instance, VRChatAPIError) else instance
+        cards.append({
+            "world_name": world.name if world else location.world_id,
+            "thumbnail": world.thumbnail_image_url if world else "",
+            "instance_name": location.name,
+            "access_type": location.access_type,
+            "region": location.region,
+            "occupants": instance.occupants if instance else None,
+            "capacity": (instance.capacity if instance else 0) or (world.capacity if world else 0),
+            "friends": members,
+        })
+    cards.sort(key=lambda card: len(card["friends"]), reverse=True)
+    return cards
+
+
 async def render_friendsinfo(friends_status: bool, friends_number: int) -> Union[bytes, str]:
-    """渲染好友信息"""
+    """渲染好友信息，friends_status 为 True 时查询离线好友"""
     try:
-        friends_info = await vrchat.get_friends(friends_status, friends_number)
-        if type(friends_info) == str:
-            return friends_info
-        new_friends_info = []
         web_friends_info = []
         private_friends_info = []
-        for friend in friends_info:
-            displayName = friend["displayName"]
-            user_icon = friend["userIcon"] or friend["currentAvatarThumbnailImageUrl"]
-            _, _, color = get_trust_level(friend['tags'])
-            status = STATUS_MAP.get(friend["status"], friend["status"])
-            location = friend["location"]
-            if location == "offline":
-                web_friends_info.append({
-                    "displayName": displayName,
-                    "user_icon": user_icon,
-                    "color": color,
-                    "status": status
-                })
-            elif location == "private":
-                private_friends_info.append({
-                    "displayName": displayName,
-                    "user_icon": user_icon,
-                    "color": color,
-                    "status": status
-                })
-            else:
-                match = re.search(LOCATION_PATTERN, location)
-                uuid = "wrld_" + match.group(1)
-                room_id = match.group(2)
-                access_type = match.group(3) if match.group(3) else "public"
-                region = match.group(4)
-                if access_type == "hidden":
-                    access_type = "friend+"
-                location = (await vrchat.get_world(uuid))["name"] + " #" + str(room_id) + " " +access_type
-                new_friends_info.append({
-                    "displayName": displayName,
-                    "user_icon": user_icon,
-                    "location": location,
+        instances: Dict[str, List[Dict]] = {}
+        locations: Dict[str, Location] = {}
+
+        # 边分页边按实例分组，世界和实例信息最后按组各请求一次
+        try:
+            async for friend in iter_friends(friends_status, friends_number):
+                _, _, color = get_trust_level(friend.tags)
+                friend_info = {
+                    "displayName": friend.display_name,
+                    "user_icon": friend.icon,
                     "color": color,
-                    "status": status,
-                    "region": region
-                })
-        friend_count = len(new_friends_info)
+                    "status": STATUS_MAP.get(friend.status, friend.status),
+                }
+                if friend.location == "offline":
+                    web_friends_info.append(friend_info)
+                    continue
+                location = parse_location(friend.location)
+                if location is None:
+                    # private、traveling 等无法确定实例的位置
+                    private_friends_info.append(friend_info)
+                    continue
+                instances.setdefault(location.key, []).append(friend_info)
+                locations[location.key] = location
+        except VRChatAPIError as e:
+            return str(e)
+
+        worlds, occupancy = await asyncio.gather(
+            vrchat.get_many("worlds", [location.world_id for location in locations.values()]),
+            vrchat.get_many("instances", list(locations)),
+        )
+        instance_cards = build_instance_cards(instances, locations, worlds, occupancy)
+
+        friend_count = sum(len(card["friends"]) for card in instance_cards)
         web_count = len(web_friends_info)
         private_count = len(private_friends_info)
-        height = 90 + (friend_count + 1) // 2 * 50 + (
+        height = 90 + sum(80 + (len(card["friends"]) + 1) // 2 * 50 for card in instance_cards) + (
             web_count + 1) // 2 * 50 + (private_count + 1) // 2 * 50
         template_data = {
-            "friends_info": new_friends_info,
+            "instances": instance_cards,
             "private_friends_info": private_friends_info,
             "web_friends_info": web_friends_info,
             "friend_count": friend_count,
+            "instance_count": len(instance_cards),
             "web_count": web_count,
             "private_count": private_count,
+            "offline": friends_status,
         }
-        return await template_to_pic(
-            template_path=str((TEMPLATE_PATH / "vrchat").absolute()),
-            template_name="friends.html",
-            templates=template_data,
-            pages={
-                "viewport": {"width": 850, "height": height},
-                "base_url": f"file://{TEMPLATE_PATH}"
-            }
-        )
+        return await render_card("friends.html", template_data, 850, height)
     except Exception as e:
         logger.error(f"渲染好友信息失败: {str(e)}")
-        return "渲染好友信息失败"
\ No newline at end of file
+        return "渲染好友信息失败"
@@ -0,0 +1,232 @@
+import asyncio
+import difflib
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from mengluo_vrc_bot.services.log import logger
+
+from .vrchat_models import Avatar, Group, GroupMember, LimitedUser, Model, UserGroup, World
+
+# 参与索引的实体类型
+SEARCH_KINDS = ("users", "worlds", "avatars", "groups")
+TRIGRAM = 3  # trigram 分词器的最短可匹配长度
+FUZZY_THRESHOLD = 0.5
+FUZZY_CANDIDATES = 5  # 模糊匹配时按 limit 的倍数取候选
+
+
+class SearchHit:
+    """搜索结果"""
+
+    __slots__ = ("kind", "id", "name", "author", "code", "score")
+
+    def __init__(self, kind: str, id: str, name: str, author: str = "", code: str = "", score: float = 0.0):
+        self.kind = kind
+        self.id = id
+        self.name = name
+        self.author = author
+        self.code = code
+        self.score = score
+
+    def __repr__(self) -> str:
+        return f"SearchHit({self.kind}, {self.id!r}, {self.name!r})"
+
+
+def hit_from_model(model: Model) -> Optional[SearchHit]:
+    """将实体模型转换为索引条目，不可索引的模型返回 None"""
+    if isinstance(model, LimitedUser):
+        return SearchHit("users", model.id, model.display_name)
+    if isinstance(model, World):
+        return SearchHit("worlds", model.id, model.name, model.author_name)
+    if isinstance(model, Avatar):
+        return SearchHit("avatars", model.id, model.name, model.author_name)
+    if isinstance(model, Group):
+        code = f"{model.short_code}.{model.discriminator}" if model.short_code else ""
+        return SearchHit("groups", model.id, model.name, code=code)
+    if isinstance(model, GroupMember):
+        return SearchHit("users", model.user_id, model.display_name)
+    if isinstance(model, UserGroup) and model.group_id:
+        return SearchHit("groups", model.group_id, model.name)
+    return None
+
+
+def _phrase(text: str) -> str:
+    """转义为 FTS5 短语"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _similarity(query: str, hit: SearchHit) -> float:
+    """搜索词与名称/作者/短代码中最接近的一项的相似度（0~1）"""
+    query = query.lower()
+    fields = [field.lower() for field in (hit.name, hit.author, hit.code) if field]
+    return max((difflib.SequenceMatcher(None, query, field).ratio() for field in fields), default=0.0)
+
+
+class SearchIndex:
+    """
+    基于 SQLite FTS5 的本地实体索引
+
+    说明:
+        entities 为普通表（id 唯一），entity_fts 为其外部内容 FTS5 表，由触发器同步。
+        使用 trigram 分词器，支持名称、作者、群组短代码的子串/前缀匹配（含中文）；
+        不足 3 个字符的查询退回 LIKE，匹配结果不足时按 trigram 取候选做模糊匹配。
+        阻塞操作在线程池中执行，SQLite 不支持 FTS5 trigram 时索引自动停用。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.enabled = True
+        try:
+            self._init_db()
+        except sqlite3.Error as e:
+            self.enabled = False
+            logger.error(f"初始化搜索索引失败，搜索将直接使用VRChat API: {e}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS entities
+                    (id TEXT PRIMARY KEY,
+                     kind TEXT NOT NULL,
+                     name TEXT NOT NULL,
+                     author TEXT NOT NULL DEFAULT '',
+                     code TEXT NOT NULL DEFAULT '',
+                     updated_at REAL NOT NULL);
+                CREATE VIRTUAL TABLE IF NOT EXISTS entity_fts USING fts5
+                    (name, author, code, content='entities', content_rowid='rowid', tokenize='trigram');
+                CREATE TRIGGER IF NOT EXISTS entities_ai AFTER INSERT ON entities BEGIN
+                    INSERT INTO entity_fts(rowid, name, author, code)
+                    VALUES (new.rowid, new.name, new.author, new.code);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entities_ad AFTER DELETE ON entities BEGIN
+                    INSERT INTO entity_fts(entity_fts, rowid, name, author, code)
+                    VALUES ('delete', old.rowid, old.name, old.author, old.code);
+                END;
+                CREATE TRIGGER IF NOT EXISTS entities_au AFTER UPDATE ON entities BEGIN
+                    INSERT INTO entity_fts(entity_fts, rowid, name, author, code)
+                    VALUES ('delete', old.rowid, old.name, old.author, old.code);
+                    INSERT INTO entity_fts(rowid, name, author, code)
+                    VALUES (new.rowid, new.name, new.author, new.code);
+                END;
+            ''')
+
+    def _add(self, hits: List[SearchHit]):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO entities (id, kind, name, author, code, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, "
+                "author = CASE WHEN excluded.author != '' THEN excluded.author ELSE entities.author END, "
+                "code = CASE WHEN excluded.code != '' THEN excluded.code ELSE entities.code END, "
+                "updated_at = excluded.updated_at",
+                [(hit.id, hit.kind, hit.name, hit.author, hit.code, now) for hit in hits],
+            )
+
+    def _rows(self, conn: sqlite3.Connection, sql: str, params: Tuple) -> List[SearchHit]:
+        return [SearchHit(*row) for row in conn.execute(sql, params).fetchall()]
+
+    def _search(self, kind: str, query: str, limit: int) -> List[SearchHit]:
+        columns = "e.kind, e.id, e.name, e.author, e.code"
+        prefix = f"{_escape_like(query)}%"
+        contains = f"%{_escape_like(query)}%"
+        with self._connect() as conn:
+            if len(query) >= TRIGRAM:
+                # 名称前缀匹配优先，其次按 bm25 相关度
+                hits = self._rows(
+                    conn,
+                    f"SELECT {columns}, bm25(entity_fts, 10.0, 2.0, 5.0) - (e.name LIKE ? ESCAPE '\\') * 100 "
+                    "FROM entity_fts JOIN entities e ON e.rowid = entity_fts.rowid "
+                    "WHERE entity_fts MATCH ? AND e.kind = ? ORDER BY 6 LIMIT ?",
+                    (prefix, f"{{name author code}}: {_phrase(query)}", kind, limit),
+                )
+            else:
+                hits = self._rows(
+                    conn,
+                    f"SELECT {columns}, -(e.name LIKE ? ESCAPE '\\') FROM entities e "
+                    "WHERE e.kind = ? AND (e.name LIKE ? ESCAPE '\\' OR e.author LIKE ? ESCAPE '\\' "
+                    "OR e.code LIKE ? ESCAPE '\\') ORDER BY 6, length(e.name) LIMIT ?",
+                    (prefix, kind, contains, contains, contains, limit),
+                )
+            if len(hits) >= limit or len(query) <= TRIGRAM:
+                return hits
+
+            # 模糊匹配：任意一个 trigram 命中即为候选，再按相似度排序
+            grams = {query[i:i + TRIGRAM] for i in range(len(query) - TRIGRAM + 1)}
+            candidates = self._rows(
+                conn,
+                f"SELECT {columns}, 0 FROM entity_fts JOIN entities e ON e.rowid = entity_fts.rowid "
+                "WHERE entity_fts MATCH ? AND e.kind = ? ORDER BY bm25(entity_fts) LIMIT ?",
+                (" OR ".join(_phrase(gram) for gram in grams), kind, limit * FUZZY_CANDIDATES),
+            )
+        seen = {hit.id for hit in hits}
+        fuzzy = []
+        for hit in candidates:
+            if hit.id in seen:
+                continue
+            hit.score = _similarity(query, hit)
+            if hit.score >= FUZZY_THRESHOLD:
+                fuzzy.append(hit)
+        fuzzy.sort(key=lambda hit: hit.score, reverse=True)
+        return hits + fuzzy[:limit - len(hits)]
+
+    def _count(self) -> Dict[str, int]:
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT kind, COUNT(*) FROM entities GROUP BY kind").fetchall())
+
+    async def add(self, models: Iterable[Model]):
+        """写入（或更新）实体，不可索引的模型会被忽略"""
+        if not self.enabled:
+            return
+        hits = [hit for hit in map(hit_from_model, models) if hit is not None and hit.id and hit.name]
+        if not hits:
+            return
+        try:
+            await asyncio.to_thread(self._add, hits)
+        except sqlite3.Error as e:
+            logger.error(f"写入搜索索引失败: {e}")
+
+    async def search(self, kind: str, query: str, limit: int = 10) -> List[SearchHit]:
+        """
+        在本地索引中搜索
+
+        Args:
+            kind: 实体类型（users/worlds/avatars/groups）
+            query: 搜索词，匹配名称、作者名和群组短代码
+            limit: 最多返回的条数
+
+        Returns:
+            按相关度排序的结果，索引不可用时为空列表
+        """
+        query = query.strip()
+        if not self.enabled or not query:
+            return []
+        try:
+            return await asyncio.to_thread(self._search, kind, query, limit)
+        except sqlite3.Error as e:
+            logger.error(f"查询搜索索引失败: {e}")
+            return []
+
+    async def stats(self) -> Dict[str, int]:
+        """各实体类型的索引条目数"""
+        if not self.enabled:
+            return {}
+        try:
+            return await asyncio.to_thread(self._count)
+        except sqlite3.Error as e:
+            logger.error(f"读取搜索索引失败: {e}")
+            return {}
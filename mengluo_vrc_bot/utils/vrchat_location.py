@@ -0,0 +1,78 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+# ~tag 或 ~tag(value)
+INSTANCE_TAG_PATTERN = re.compile(r"~([A-Za-z]+)(?:\(([^)]*)\))?")
+DEFAULT_REGION = "us"
+GROUP_ACCESS_TYPES = {
+    "public": "group public",
+    "plus": "group+",
+    "members": "group",
+}
+
+
+class Location:
+    """
+    解析后的实例位置
+
+    Attributes:
+        world_id: 世界id
+        instance_id: 实例id（冒号之后的全部内容），与 world_id 组成 instances/ 端点的key
+        name: 实例编号（如 12345）
+        access_type: public / friend+ / friends / invite / invite+ / group / group+ / group public
+        region: 服务器区域（us/use/eu/jp）
+        owner_id: 实例创建者或所属群组的id，公开实例为 None
+    """
+
+    __slots__ = ("world_id", "instance_id", "name", "access_type", "region", "owner_id")
+
+    def __init__(self, world_id: str, instance_id: str, name: str, access_type: str, region: str,
+                 owner_id: Optional[str]):
+        self.world_id = world_id
+        self.instance_id = instance_id
+        self.name = name
+        self.access_type = access_type
+        self.region = region
+        self.owner_id = owner_id
+
+    @property
+    def key(self) -> str:
+        """world_id:instance_id，即 instances/{key} 中的key"""
+        return f"{self.world_id}:{self.instance_id}"
+
+    def __repr__(self) -> str:
+        return f"Location({self.key!r})"
+
+
+@lru_cache(maxsize=4096)
+def parse_location(location: str) -> Optional[Location]:
+    """
+    解析 wrld_xxx:12345~hidden(usr_xxx)~region(jp) 形式的位置字符串
+
+    说明:
+        结果会被缓存，返回的对象不应修改。
+
+    Returns:
+        解析结果；offline、private、traveling 等非实例位置返回 None
+    """
+    if not location or not location.startswith("wrld_") or ":" not in location:
+        return None
+    world_id, _, instance_id = location.partition(":")
+    name, _, _ = instance_id.partition("~")
+    tags = dict(INSTANCE_TAG_PATTERN.findall(instance_id[len(name):]))
+
+    owner_id = None
+    if "hidden" in tags:
+        access_type, owner_id = "friend+", tags["hidden"]
+    elif "friends" in tags:
+        access_type, owner_id = "friends", tags["friends"]
+    elif "private" in tags:
+        access_type = "invite+" if "canRequestInvite" in tags else "invite"
+        owner_id = tags["private"]
+    elif "group" in tags:
+        access_type = GROUP_ACCESS_TYPES.get(tags.get("groupAccessType", ""), "group")
+        owner_id = tags["group"]
+    else:
+        access_type = "public"
+    return Location(world_id, instance_id, name, access_type, tags.get("region") or DEFAULT_REGION, owner_id)
@@ -0,0 +1,345 @@
+import re
+from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type
+
+
+class Field:
+    """
+    模型字段定义
+
+    Args:
+        key: JSON 中的键，支持用 . 表示嵌套（如 file.sizeInBytes）
+        default: 缺失或为 null 时的默认值，可调用对象（如 list）会在每次使用时调用
+        model: 嵌套的模型类型
+        many: 是否为模型列表
+    """
+
+    __slots__ = ("key", "path", "default", "model", "many")
+
+    def __init__(self, key: str, default: Any = None, model: Optional[Type["Model"]] = None, many: bool = False):
+        self.key = key
+        self.path = tuple(key.split("."))
+        self.default = default
+        self.model = model
+        self.many = many
+
+    def get_default(self) -> Any:
+        return self.default() if callable(self.default) else self.default
+
+
+class ModelMeta(type):
+    """根据 FIELDS 自动生成 __slots__，父类字段会被继承"""
+
+    def __new__(mcs, name, bases, namespace):
+        own_fields = namespace.get("FIELDS", {})
+        fields: Dict[str, Field] = {}
+        for base in bases:
+            fields.update(getattr(base, "FIELDS", {}))
+        inherited = set(fields)
+        fields.update(own_fields)
+        namespace["FIELDS"] = fields
+        namespace["__slots__"] = tuple(field for field in own_fields if field not in inherited)
+        return super().__new__(mcs, name, bases, namespace)
+
+
+class Model(metaclass=ModelMeta):
+    """
+    VRChat 响应模型基类
+
+    说明:
+        解码时只保留 FIELDS 中声明的字段，未声明的字段直接丢弃；
+        to_dict() 按原始 JSON 键还原，用于持久化缓存和模板渲染。
+    """
+
+    FIELDS: ClassVar[Dict[str, Field]] = {}
+
+    def __init__(self, **values):
+        for name, field in self.FIELDS.items():
+            setattr(self, name, values[name] if name in values else field.get_default())
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Model":
+        obj = cls.__new__(cls)
+        for name, field in cls.FIELDS.items():
+            value = data
+            for key in field.path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is None:
+                value = field.get_default()
+            elif field.model is not None:
+                if field.many:
+                    value = [field.model.from_dict(item) for item in value]
+                else:
+                    value = field.model.from_dict(value)
+            setattr(obj, name, value)
+        return obj
+
+    def to_dict(self) -> Dict:
+        data: Dict = {}
+        for name, field in self.FIELDS.items():
+            value = getattr(self, name)
+            if field.model is not None and value is not None:
+                value = [item.to_dict() for item in value] if field.many else value.to_dict()
+            target = data
+            for key in field.path[:-1]:
+                target = target.setdefault(key, {})
+            target[field.path[-1]] = value
+        return data
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and all(
+            getattr(self, name) == getattr(other, name) for name in self.FIELDS
+        )
+
+    def __repr__(self) -> str:
+        identity = getattr(self, "id", None)
+        return f"{type(self).__name__}(id={identity!r})"
+
+
+class UnityPackage(Model):
+    FIELDS = {
+        "asset_url": Field("assetUrl", ""),
+        "platform": Field("platform", ""),
+        "unity_version": Field("unityVersion", ""),
+        "performance_rating": Field("performanceRating", ""),
+        "variant": Field("variant"),
+        "impostorizer_version": Field("impostorizerVersion", ""),
+    }
+
+
+class Badge(Model):
+    FIELDS = {
+        "badge_image_url": Field("badgeImageUrl", ""),
+    }
+
+
+class LimitedUser(Model):
+    """用户摘要（搜索结果等）"""
+
+    FIELDS = {
+        "id": Field("id", ""),
+        "display_name": Field("displayName", ""),
+        "user_icon": Field("userIcon", ""),
+        "current_avatar_thumbnail_image_url": Field("currentAvatarThumbnailImageUrl", ""),
+        "tags": Field("tags", list),
+        "status": Field("status", ""),
+        "status_description": Field("statusDescription", ""),
+    }
+
+    @property
+    def icon(self) -> str:
+        return self.user_icon or self.current_avatar_thumbnail_image_url
+
+
+class Friend(LimitedUser):
+    """好友列表中的用户"""
+
+    FIELDS = {
+        "location": Field("location", "offline"),
+        "platform": Field("platform", ""),
+        "last_platform": Field("last_platform", ""),
+    }
+
+
+class User(LimitedUser):
+    """用户详情"""
+
+    FIELDS = {
+        "bio": Field("bio", ""),
+        "pronouns": Field("pronouns", ""),
+        "age_verification_status": Field("ageVerificationStatus", ""),
+        "age_verified": Field("ageVerified", False),
+        "allow_avatar_copying": Field("allowAvatarCopying", False),
+        "date_joined": Field("date_joined", ""),
+        "current_avatar_image_url": Field("currentAvatarImageUrl", ""),
+        "platform": Field("platform", ""),
+        "last_platform": Field("last_platform", ""),
+        "location": Field("location", ""),
+        "badges": Field("badges", list, model=Badge, many=True),
+    }
+
+
+class World(Model):
+    FIELDS = {
+        "id": Field("id", ""),
+        "name": Field("name", ""),
+        "author_id": Field("authorId", ""),
+        "author_name": Field("authorName", ""),
+        "description": Field("description", ""),
+        "capacity": Field("capacity", 0),
+        "recommended_capacity": Field("recommendedCapacity", 0),
+        "occupants": Field("occupants", 0),
+        "visits": Field("visits", 0),
+        "favorites": Field("favorites", 0),
+        "heat": Field("heat", 0),
+        "popularity": Field("popularity", 0),
+        "release_status": Field("releaseStatus", ""),
+        "tags": Field("tags", list),
+        "thumbnail_image_url": Field("thumbnailImageUrl", ""),
+        "version": Field("version", 0),
+        "created_at": Field("created_at", "none"),
+        "updated_at": Field("updated_at", "none"),
+        "labs_publication_date": Field("labsPublicationDate", "none"),
+        "publication_date": Field("publicationDate", "none"),
+        "unity_packages": Field("unityPackages", list, model=UnityPackage, many=True),
+    }
+
+
+class Avatar(Model):
+    FIELDS = {
+        "id": Field("id", ""),
+        "name": Field("name", ""),
+        "author_id": Field("authorId", ""),
+        "author_name": Field("authorName", ""),
+        "description": Field("description", ""),
+        "thumbnail_image_url": Field("thumbnailImageUrl", ""),
+        "version": Field("version", 0),
+        "created_at": Field("created_at", "none"),
+        "updated_at": Field("updated_at", "none"),
+        "unity_packages": Field("unityPackages", list, model=UnityPackage, many=True),
+    }
+
+
+class Group(Model):
+    FIELDS = {
+        "id": Field("id", ""),
+        "name": Field("name", ""),
+        "short_code": Field("shortCode", ""),
+        "discriminator": Field("discriminator", ""),
+        "description": Field("description", ""),
+        "rules": Field("rules", ""),
+        "owner_id": Field("ownerId", ""),
+        "icon_url": Field("iconUrl", ""),
+        "banner_url": Field("bannerUrl", ""),
+        "join_state": Field("joinState", ""),
+        "languages": Field("languages", list),
+        "links": Field("links", list),
+        "member_count": Field("memberCount", 0),
+        "online_member_count": Field("onlineMemberCount", 0),
+        "created_at": Field("createdAt", "none"),
+    }
+
+
+class UserGroup(Model):
+    """用户所属群组（users/{id}/groups）"""
+
+    FIELDS = {
+        "id": Field("id", ""),
+        "group_id": Field("groupId", ""),
+        "name": Field("name", ""),
+        "icon_id": Field("iconId"),
+        "icon_url": Field("iconUrl", ""),
+        "owner_id": Field("ownerId", ""),
+        "member_count": Field("memberCount", ""),
+        "is_representing": Field("isRepresenting", False),
+    }
+
+
+class GroupMember(Model):
+    """群组成员（groups/{id}/members），VRChat 返回的 user 通常不带 tags"""
+
+    FIELDS = {
+        "id": Field("id", ""),
+        "user_id": Field("userId", ""),
+        "display_name": Field("user.displayName", ""),
+        "tags": Field("user.tags", list),
+        "role_ids": Field("roleIds", list),
+        "joined_at": Field("joinedAt", ""),
+        "membership_status": Field("membershipStatus", ""),
+    }
+
+
+class GroupRole(Model):
+    """群组身份组（groups/{id}/roles）"""
+
+    FIELDS = {
+        "id": Field("id", ""),
+        "group_id": Field("groupId", ""),
+        "name": Field("name", ""),
+        "order": Field("order", 0),
+    }
+
+
+class Instance(Model):
+    """实例（instances/{worldId}:{instanceId}）"""
+
+    FIELDS = {
+        "id": Field("id", ""),
+        "world_id": Field("worldId", ""),
+        "name": Field("name", ""),
+        "type": Field("type", ""),
+        "region": Field("region", ""),
+        "user_count": Field("userCount"),
+        "n_users": Field("n_users", 0),
+        "capacity": Field("capacity", 0),
+        "full": Field("full", False),
+    }
+
+    @property
+    def occupants(self) -> int:
+        return self.n_users if self.user_count is None else self.user_count
+
+
+class FileVersion(Model):
+    FIELDS = {
+        "version": Field("version", 0),
+        "size_in_bytes": Field("file.sizeInBytes"),
+    }
+
+
+class FileInfo(Model):
+    FIELDS = {
+        "id": Field("id", ""),
+        "name": Field("name", ""),
+        "owner_id": Field("ownerId", ""),
+        "versions": Field("versions", list, model=FileVersion, many=True),
+    }
+
+
+# 端点 -> 模型，按顺序匹配（更具体的放前面）
+ENDPOINT_MODELS: List[Tuple[re.Pattern, Type[Model]]] = [
+    (re.compile(r"(?:^|/)users/[^/]+/groups/represented$"), UserGroup),
+    (re.compile(r"(?:^|/)users/[^/]+/groups$"), UserGroup),
+    (re.compile(r"(?:^|/)users/[^/]+$"), User),
+    (re.compile(r"(?:^|/)groups/[^/]+/members$"), GroupMember),
+    (re.compile(r"(?:^|/)groups/[^/]+/roles$"), GroupRole),
+    (re.compile(r"(?:^|/)worlds/[^/]+$"), World),
+    (re.compile(r"(?:^|/)avatars/[^/]+$"), Avatar),
+    (re.compile(r"(?:^|/)groups/[^/]+$"), Group),
+    (re.compile(r"(?:^|/)instances/[^/]+$"), Instance),
+    (re.compile(r"(?:^|/)file/[^/]+$"), FileInfo),
+    (re.compile(r"(?:^|/)auth/user/friends$"), Friend),
+    # 搜索接口
+    (re.compile(r"(?:^|/)users$"), LimitedUser),
+    (re.compile(r"(?:^|/)worlds$"), World),
+    (re.compile(r"(?:^|/)groups$"), Group),
+]
+
+
+def model_for(endpoint: str) -> Optional[Type[Model]]:
+    """获取端点对应的模型类型"""
+    path = endpoint.split("?", 1)[0]
+    for pattern, model in ENDPOINT_MODELS:
+        if pattern.search(path):
+            return model
+    return None
+
+
+def decode(endpoint: str, data: Any) -> Any:
+    """将端点返回的 JSON 解码为模型（列表），没有对应模型时原样返回"""
+    model = model_for(endpoint)
+    if model is None:
+        return data
+    if isinstance(data, list):
+        return [model.from_dict(item) for item in data]
+    if isinstance(data, dict):
+        return model.from_dict(data)
+    return data
+
+
+def encode(value: Any) -> Any:
+    """将模型（列表）还原为可序列化的 JSON 数据"""
+    if isinstance(value, Model):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [encode(item) for item in value]
+    return value
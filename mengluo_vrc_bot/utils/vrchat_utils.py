@@ -1,94 +1,740 @@
-from typing import Dict, Union
+import asyncio
+import random
+import re
+import time
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, ClassVar, Dict, Hashable, Iterable, List, Optional, Set, Union
+from urllib.parse import urlparse
+from .cache import DecayingCounter, EntityCache, NegativeCache, cache_kind
+from .circuit_breaker import CircuitBreakerRegistry, CircuitOpenError
+from .concurrency import SingleFlight
+from .file_meta import FileMeta, FileMetaStore, metas_from_file_info
 from .http_utils import AsyncHttpx
-from mengluo_vrc_bot.services.account_refresh import get_cookie, update_cookie
+from .rate_limit import RateLimiter, RateLimitTimeout, endpoint_family
+from .search_index import SearchHit, SearchIndex, hit_from_model
+from .vrchat_models import (
+    Avatar, FileInfo, Friend, Group, GroupMember, GroupRole, Instance, User, UserGroup, World, decode, encode
+)
+import httpx
+from httpx import Response
+from mengluo_vrc_bot.config.path import DATA_PATH
+from mengluo_vrc_bot.config.settings import settings
+from mengluo_vrc_bot.services.account_refresh import AccountSession, VRCAuthError, VRCLoginPendingError, pool
 from mengluo_vrc_bot.services.log import logger
 import ujson
 
 
+CACHE_FILE = DATA_PATH / "vrchat_cache.db"
+SEARCH_INDEX_FILE = DATA_PATH / "vrchat_search.db"
+FILE_META_FILE = DATA_PATH / "vrchat_files.db"
+BUSY_MESSAGE = "错误：VRChat API繁忙，请稍后再试。"
+UNAVAILABLE_MESSAGE = "错误：VRChat API暂时不可用，请稍后再试。"
+NOT_FOUND_PREFIX = "未找到资源"
+FRIENDS_PAGE_SIZE = 100  # auth/user/friends 单页上限
+GROUP_MEMBERS_PAGE_SIZE = 100  # groups/{id}/members 单页上限
+ACCESS_MAX_ENTRIES = 4096  # 访问频率统计最多记录的实体数
+# 结果取决于请求所用账号的端点，只用主账号请求：auth/*（当前用户、好友列表），
+# 以及 users/{id}（位置、状态等字段只对该用户的好友可见，缓存不区分账号）
+PRIMARY_ONLY_PATTERN = re.compile(r"^(?:auth(?:/|$)|users/[^/]+$)")
+# 实体类型 -> (VRChat搜索端点, 搜索参数名)，avatars 没有公开的搜索接口，只查本地索引
+SEARCH_ENDPOINTS = {
+    "users": ("users", "search"),
+    "worlds": ("worlds", "search"),
+    "groups": ("groups", "query"),
+}
+
+# 当前任务中使用到的最旧的过期缓存数据时间（time.time()），None 表示全部为最新数据
+_data_as_of: ContextVar[Optional[float]] = ContextVar("vrchat_data_as_of", default=None)
+
+
+def reset_data_as_of():
+    """重置当前任务的数据时间标记，应在一次渲染开始时调用"""
+    _data_as_of.set(None)
+
+
+def data_as_of() -> Optional[float]:
+    """获取当前任务中使用的过期数据的时间，没有使用过期数据时返回 None"""
+    return _data_as_of.get()
+
+
+def _mark_data_as_of(stored_at: float):
+    current = _data_as_of.get()
+    _data_as_of.set(stored_at if current is None else min(current, stored_at))
+
+
 class VRChatAPIError(Exception):
-    """VRChat API相关异常"""
+    """VRChat API相关异常，异常信息可直接展示给用户"""
+    pass
+
+
+class VRChatNotFoundError(VRChatAPIError):
+    """请求的资源不存在（404）"""
+    pass
+
+
+class VRChatBusyError(VRChatAPIError):
+    """被限流或排队超时"""
+    pass
+
+
+class VRChatUnavailableError(VRChatAPIError):
+    """目标主机熔断中"""
     pass
 
 
 class VRChatAPI:
     """VRChat API工具类"""
     
-    BASE_URL = "https://api.vrchat.cloud/api/1/"
+    BASE_URL = settings.vrc_api_base_url
+    
+    # 所有实例共享，保证不同调用方的相同请求也能合并
+    _flight: ClassVar[SingleFlight] = SingleFlight()
+    _limiter: ClassVar[RateLimiter] = RateLimiter(
+        settings.vrc_rate_limit_rate,
+        settings.vrc_rate_limit_burst,
+        max_wait=settings.vrc_rate_limit_max_wait,
+        overrides=settings.vrc_rate_limit_families,
+    )
+    _cache: ClassVar[EntityCache] = EntityCache(
+        settings.vrc_cache_ttl,
+        settings.vrc_cache_max_entries,
+        persistent_path=CACHE_FILE if settings.vrc_cache_persistent else None,
+        encoder=encode,
+        decoder=decode,
+    )
+    _negative: ClassVar[NegativeCache] = NegativeCache(
+        settings.vrc_negative_cache_ttl,
+        settings.vrc_negative_cache_max_entries,
+    )
+    _breakers: ClassVar[CircuitBreakerRegistry] = CircuitBreakerRegistry(
+        window=settings.vrc_breaker_window,
+        failure_rate=settings.vrc_breaker_failure_rate,
+        min_calls=settings.vrc_breaker_min_calls,
+        reset_timeout=settings.vrc_breaker_reset_timeout,
+        half_open_max=settings.vrc_breaker_half_open_max,
+    )
+    _index: ClassVar[SearchIndex] = SearchIndex(SEARCH_INDEX_FILE)
+    _access: ClassVar[DecayingCounter] = DecayingCounter(settings.vrc_prefetch_half_life, ACCESS_MAX_ENTRIES)
+    _files: ClassVar[FileMetaStore] = FileMetaStore(
+        settings.vrc_file_meta_max_entries,
+        persistent_path=FILE_META_FILE if settings.vrc_cache_persistent else None,
+    )
+    _background: ClassVar[Set[asyncio.Task]] = set()
+    
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Args:
+            base_url: API地址，默认使用配置项 VRC_API_BASE_URL
+            transport: 自定义传输层（如 httpx.ASGITransport），用于离线测试和压测
+        """
+        if base_url:
+            self.BASE_URL = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.transport = transport
+    
+    def _request_key(self, endpoint: str, kwargs: Dict) -> Hashable:
+        """生成请求合并使用的key（API地址 + 端点 + 参数）"""
+        return self.BASE_URL, endpoint, repr(sorted(kwargs.items()))
+    
+    def _cache_key(self, endpoint: str) -> str:
+        """生成缓存key，非默认API地址（如模拟服务器）的数据与真实数据分开存放"""
+        if self.BASE_URL == settings.vrc_api_base_url:
+            return endpoint
+        return f"{self.BASE_URL}{endpoint}"
+    
+    @classmethod
+    def request_stats(cls) -> Dict[str, int]:
+        """
+        请求合并统计
+        
+        Returns:
+            executed: 实际发往VRChat的请求数
+            shared: 被合并、直接复用结果的请求数
+            in_flight: 当前进行中的请求数
+        """
+        return cls._flight.stats()
+    
+    @classmethod
+    def rate_limit_stats(cls) -> Dict[str, Dict[str, float]]:
+        """各端点分组的限流状态"""
+        return cls._limiter.stats()
+    
+    @classmethod
+    def cache_stats(cls) -> Dict[str, int]:
+        """实体缓存命中/未命中/淘汰统计"""
+        return cls._cache.stats()
+    
+    @classmethod
+    def circuit_stats(cls) -> Dict[str, Dict[str, object]]:
+        """各主机熔断器状态（closed/open/half_open）及错误率"""
+        return cls._breakers.stats()
     
-    def __init__(self):
-        self._cookie_updated = False  # 避免重复更新cookie
+    @classmethod
+    def negative_cache_stats(cls) -> Dict[str, int]:
+        """404 结果缓存统计"""
+        return cls._negative.stats()
     
-    async def _make_request(self, endpoint: str, **kwargs) -> Union[Dict, str]:
+    @classmethod
+    def hot_entities(cls, kind: str, n: int) -> List[str]:
+        """近期访问最频繁的 n 个实体id（按衰减后的访问次数排序）"""
+        return [key.split("/", 1)[1] for key in cls._access.top(n, f"{kind}/")]
+    
+    @classmethod
+    def rate_limit_headroom(cls, endpoint: str) -> float:
+        """端点所在分组剩余令牌占桶容量的比例（0~1，取可用账号中余量最多的），暂停中为 0"""
+        family = endpoint_family(endpoint)
+        sessions = [pool.primary] if PRIMARY_ONLY_PATTERN.search(endpoint) else pool.sessions
+        return max(
+            cls._limiter.available(endpoint, session.name) / cls._limiter.bucket(family, session.name).capacity
+            for session in sessions
+        )
+    
+    @classmethod
+    def session_stats(cls) -> Dict[str, Dict[str, object]]:
+        """各账号会话的健康状态"""
+        return pool.stats()
+    
+    @classmethod
+    def file_meta_stats(cls) -> Dict[str, int]:
+        """文件元数据存储命中统计"""
+        return cls._files.stats()
+    
+    @classmethod
+    async def search_index_stats(cls) -> Dict[str, int]:
+        """本地搜索索引中各实体类型的条目数"""
+        return await cls._index.stats()
+    
+    @classmethod
+    async def invalidate(cls, endpoint: Optional[str] = None, kind: Optional[str] = None):
+        """
+        使实体缓存失效
+        
+        Args:
+            endpoint: 指定端点，如 worlds/wrld_xxx
+            kind: 指定实体类型（users/worlds/avatars/groups/file/instances）；两者都为空时清空全部
+        """
+        if endpoint is not None:
+            cls._negative.discard(endpoint)
+        elif kind is None:
+            cls._negative.clear()
+        await cls._cache.invalidate(endpoint, kind)
+    
+    @classmethod
+    async def prune_cache(cls) -> int:
+        """清理持久化缓存中过期超过最大可用时长的条目"""
+        return await cls._cache.prune(settings.vrc_cache_max_stale)
+    
+    async def _make_request(self, endpoint: str, **kwargs) -> Any:
         """
         统一的API请求方法
         
+        说明:
+            可缓存的实体端点优先读取缓存；缓存过期但仍在最大可用时长内时，
+            直接返回旧数据并在后台刷新，上游出错时也会退回旧数据。
+            相同端点和参数的并发请求只会向上游发送一次。
+        
         Args:
             endpoint: API端点路径
             **kwargs: 传递给HTTP请求的额外参数
             
         Returns:
-            API响应数据或错误信息
+            解码后的响应模型（见 vrchat_models），没有对应模型的端点返回原始数据
+        
+        Raises:
+            VRChatAPIError: 请求失败且没有可用的旧数据
+        """
+        cache_key = self._cache_key(endpoint)
+        if not kwargs and self._negative.contains(cache_key):
+            raise VRChatNotFoundError(f"{NOT_FOUND_PREFIX}: {endpoint}")
+        
+        kind = None if kwargs else cache_kind(endpoint)
+        stale = None
+        if kind and endpoint.count("/") == 1 and self.BASE_URL == settings.vrc_api_base_url:
+            self._access.hit(endpoint)
+        if kind:
+            entry = await self._cache.lookup(cache_key)
+            if entry is not None and entry.fresh:
+                self._cache.record_hit()
+                return entry.value
+            if entry is not None and entry.stale_for <= settings.vrc_cache_max_stale:
+                stale = entry
+                if settings.vrc_cache_swr:
+                    self._cache.record_hit(stale=True)
+                    self._revalidate(endpoint, kind)
+                    _mark_data_as_of(stale.stored_at)
+                    return stale.value
+            self._cache.record_miss()
+        
+        try:
+            return await self._load(endpoint, kind, kwargs)
+        except VRChatNotFoundError:
+            raise
+        except VRChatAPIError:
+            # 上游不可用时退回旧数据（资源已不存在的情况除外）
+            if stale is None:
+                raise
+            logger.warning(f"VRChat API 不可用，使用 {endpoint} 的旧数据")
+            _mark_data_as_of(stale.stored_at)
+            return stale.value
+    
+    def _load(self, endpoint: str, kind: Optional[str], kwargs: Dict):
+        """合并相同请求后从上游获取数据，成功时写入缓存，404 时写入 404 结果缓存"""
+        cache_key = self._cache_key(endpoint)
+        
+        async def load():
+            try:
+                result = await self._fetch(endpoint, **kwargs)
+            except VRChatNotFoundError:
+                if not kwargs:
+                    self._negative.add(cache_key)
+                    if kind:
+                        await self._cache.invalidate(cache_key)
+                raise
+            if kind:
+                await self._cache.set(kind, cache_key, result)
+            if self.BASE_URL == settings.vrc_api_base_url:
+                await self._index.add(result if isinstance(result, list) else [result])
+            return result
+        
+        return self._flight.do(self._request_key(endpoint, kwargs), load)
+    
+    async def needs_prefetch(self, endpoint: str, horizon: float) -> bool:
+        """缓存中没有该端点，或将在 horizon 秒内过期"""
+        cache_key = self._cache_key(endpoint)
+        if cache_kind(endpoint) is None or self._negative.contains(cache_key):
+            return False
+        entry = await self._cache.lookup(cache_key)
+        return entry is None or entry.expires_at - time.time() < horizon
+    
+    async def prefetch(self, endpoint: str):
+        """
+        预先获取端点数据写入缓存，不计入访问频率
+        
+        Raises:
+            VRChatAPIError: 请求失败
+        """
+        await self._load(endpoint, cache_kind(endpoint), {})
+    
+    def _revalidate(self, endpoint: str, kind: str):
+        """在后台刷新过期的缓存"""
+        async def revalidate():
+            try:
+                await self._load(endpoint, kind, {})
+            except VRChatAPIError:
+                pass  # 已在 _fetch 中记录日志，旧数据继续可用
+        
+        task = asyncio.create_task(revalidate())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+    
+    async def _fetch(self, endpoint: str, **kwargs) -> Any:
+        """
+        向VRChat发送请求
+        
+        Args:
+            endpoint: API端点路径
+            **kwargs: 传递给HTTP请求的额外参数
+            
+        Returns:
+            解码后的响应模型
+        
+        Raises:
+            VRChatNotFoundError: 资源不存在
+            VRChatBusyError: 被限流或排队超时
+            VRChatUnavailableError: 目标主机熔断中
+            VRChatAPIError: 其他错误
         """
         url = f"{self.BASE_URL}{endpoint}"
         
         try:
-            # 第一次请求
-            cookie = await get_cookie()
-            response = await AsyncHttpx.get(url, cookies=cookie, **kwargs)
+            response = await self._send(url, endpoint, **kwargs)
             
-            # 处理认证失败
-            if response.status_code == 401 and not self._cookie_updated:
-                logger.info("检测到认证失败，正在更新Cookie...")
-                self._cookie_updated = True
-                cookie = await update_cookie()
-                response = await AsyncHttpx.get(url, cookies=cookie, **kwargs)
+            # 所有账号都被限流
+            if response.status_code == 429:
+                logger.warning(f"请求 {endpoint} 被限流")
+                raise VRChatBusyError(BUSY_MESSAGE)
             
             # 处理404错误
             if response.status_code == 404:
-                error_msg = f"未找到资源: {endpoint}"
+                error_msg = f"{NOT_FOUND_PREFIX}: {endpoint}"
                 logger.warning(error_msg)
-                return error_msg
+                raise VRChatNotFoundError(error_msg)
             
             # 检查其他HTTP错误
             response.raise_for_status()
             
-            # 重置cookie更新标志
-            self._cookie_updated = False
-            
-            return ujson.loads(response.content)
+            return decode(endpoint, ujson.loads(response.content))
             
+        except VRChatAPIError:
+            raise
+        except RateLimitTimeout as e:
+            logger.warning(f"请求 {endpoint} 排队超时: {str(e)}")
+            raise VRChatBusyError(BUSY_MESSAGE) from e
+        except VRCLoginPendingError as e:
+            logger.warning(f"请求 {endpoint} 等待登录超时: {str(e)}")
+            raise VRChatBusyError(BUSY_MESSAGE) from e
+        except CircuitOpenError as e:
+            logger.warning(f"请求 {endpoint} 被熔断: {str(e)}")
+            raise VRChatUnavailableError(UNAVAILABLE_MESSAGE) from e
         except Exception as e:
             error_msg = f"请求 {endpoint} 失败: {str(e)}"
             logger.error(error_msg)
-            return f"错误：请求VRChat API失败。"
-    async def get_avatar(self, avatar_id: str) -> Union[Dict, str]:
+            raise VRChatAPIError("错误：请求VRChat API失败。") from e
+    
+    async def _send(self, url: str, endpoint: str, **kwargs) -> Response:
+        """
+        选择账号会话，先经过熔断器、再经过该账号的限流器发送GET请求
+        
+        说明:
+            连接错误和5xx按指数退避（带随机抖动）重试；
+            收到429时按Retry-After暂停该账号的分组并移出轮换，换一个账号重试；
+            收到401时把账号移出轮换并重新登录，再换一个账号重试。
+            PRIMARY_ONLY_PATTERN 中的端点始终使用主账号，重试时等待主账号恢复。
+            账号正在登录（如等待两步验证码）时，最多等待与限流排队相同的时长。
+        
+        Raises:
+            RateLimitTimeout: 排队时间超过配置的最大等待时长
+            VRCLoginPendingError: 等待账号登录超过配置的最大等待时长
+            CircuitOpenError: 目标主机熔断中
+        """
+        breaker = self._breakers.get(urlparse(url).netloc)
+        attempts = settings.vrc_retry_attempts + 1
+        for attempt in range(attempts):
+            last_attempt = attempt == attempts - 1
+            session = self._pick_session(endpoint)
+            # 熔断中直接失败，不占用限流令牌
+            breaker.before_call()
+            try:
+                await self._limiter.acquire(endpoint, session.name)
+                cookie = await session.get_cookie(settings.vrc_rate_limit_max_wait)
+            except BaseException:
+                # 请求没有发出，归还半开探测名额
+                breaker.release()
+                raise
+            try:
+                response = await AsyncHttpx.get(
+                    url, cookies=cookie, transport=self.transport, **kwargs
+                )
+            except httpx.TransportError as e:
+                breaker.record_failure()
+                if last_attempt:
+                    raise
+                logger.warning(f"请求 {endpoint} 连接失败，准备重试: {str(e)}")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            except asyncio.CancelledError:
+                breaker.release()
+                raise
+            except Exception:
+                breaker.record_failure()
+                raise
+            
+            if response.status_code == 429:
+                breaker.record_success()
+                seconds = self._limiter.pause(endpoint, response.headers.get("Retry-After"), session.name)
+                session.mark_throttled(seconds)
+                if last_attempt:
+                    return response
+                continue
+            if response.status_code == 401:
+                breaker.record_success()
+                logger.info(f"账号{session.name}认证失败，正在更新Cookie...")
+                await self._reauthorize(session, cookie)
+                if last_attempt:
+                    return response
+                continue
+            if response.status_code >= 500:
+                breaker.record_failure()
+                if last_attempt:
+                    return response
+                logger.warning(f"请求 {endpoint} 返回 {response.status_code}，准备重试")
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            breaker.record_success()
+            return response
+        return response
+    
+    def _pick_session(self, endpoint: str) -> AccountSession:
+        """与账号相关的端点固定使用主账号，其余的在会话池中分摊"""
+        if PRIMARY_ONLY_PATTERN.search(endpoint.split("?", 1)[0]):
+            return pool.primary
+        return pool.pick(lambda session: self._limiter.available(endpoint, session.name))
+    
+    @staticmethod
+    async def _reauthorize(session: AccountSession, cookie: Dict):
+        """重新登录，并发收到 401 的请求共用同一次登录"""
+        try:
+            await session.update_cookie(stale=cookie, wait=settings.vrc_rate_limit_max_wait)
+        except VRCAuthError as e:
+            logger.error(f"账号{session.name}重新登录失败: {e}")
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """带完全随机抖动的指数退避时间"""
+        cap = min(settings.vrc_retry_backoff_max, settings.vrc_retry_backoff_base * 2 ** attempt)
+        return random.uniform(0, cap)
+    
+    async def get_many(self, kind: str, ids: Iterable[str]) -> Dict[str, Union[Any, VRChatAPIError]]:
+        """
+        批量获取同一类型的实体
+        
+        说明:
+            id 去重后，先从缓存中取出未过期的数据，
+            其余的在信号量限制下并发请求（仍经过请求合并、限流和熔断）。
+        
+        Args:
+            kind: 实体类型，即端点前缀（users/worlds/avatars/groups/file/instances）
+            ids: 实体id
+            
+        Returns:
+            id -> 实体模型；单个实体失败时对应的值为 VRChatAPIError 实例，不会抛出
+        """
+        results: Dict[str, Union[Any, VRChatAPIError]] = {}
+        pending = []
+        for entity_id in dict.fromkeys(ids):
+            entry = await self._cache.lookup(self._cache_key(f"{kind}/{entity_id}"))
+            if entry is not None and entry.fresh:
+                self._cache.record_hit()
+                results[entity_id] = entry.value
+            else:
+                pending.append(entity_id)
+        
+        semaphore = asyncio.Semaphore(settings.vrc_batch_concurrency)
+        
+        async def fetch_one(entity_id: str):
+            async with semaphore:
+                reset_data_as_of()
+                try:
+                    result = await self._make_request(f"{kind}/{entity_id}")
+                except VRChatAPIError as e:
+                    result = e
+                return entity_id, result, data_as_of()
+        
+        for entity_id, result, stored_at in await asyncio.gather(
+            *(fetch_one(entity_id) for entity_id in pending)
+        ):
+            results[entity_id] = result
+            # 子任务中的数据时间标记不会传回当前上下文，这里手动合并
+            if stored_at is not None:
+                _mark_data_as_of(stored_at)
+        return results
+    
+    async def search(self, kind: str, query: str, limit: Optional[int] = None) -> List[SearchHit]:
+        """
+        搜索实体
+        
+        说明:
+            先查本地索引（收录所有经由本类获取过的实体），
+            结果少于 VRC_SEARCH_MIN_LOCAL 条时再请求VRChat搜索接口，
+            两边按id去重合并，本地结果在前。
+        
+        Args:
+            kind: 实体类型（users/worlds/avatars/groups）
+            query: 搜索词
+            limit: 最多返回的条数，默认使用配置项 VRC_SEARCH_LIMIT
+            
+        Raises:
+            VRChatAPIError: 本地没有结果且搜索接口请求失败
+        """
+        limit = limit or settings.vrc_search_limit
+        hits = await self._index.search(kind, query, limit)
+        if len(hits) >= min(limit, settings.vrc_search_min_local) or kind not in SEARCH_ENDPOINTS:
+            return hits
+        
+        endpoint, param = SEARCH_ENDPOINTS[kind]
+        try:
+            results = await self._make_request(endpoint, params={param: query.strip(), "n": limit})
+        except VRChatAPIError:
+            if hits:
+                return hits
+            raise
+        seen = {hit.id for hit in hits}
+        for hit in map(hit_from_model, results):
+            if hit is not None and hit.id not in seen:
+                seen.add(hit.id)
+                hits.append(hit)
+        return hits[:limit]
+    
+    async def get_avatar(self, avatar_id: str) -> Avatar:
         """获取头像信息"""
         return await self._make_request(f"avatars/{avatar_id}")
     
-    async def get_user(self, user_id: str) -> Union[Dict, str]:
+    async def get_user(self, user_id: str) -> User:
         """获取用户信息"""
         return await self._make_request(f"users/{user_id}")
     
-    async def get_group(self, group_id: str) -> Union[Dict, str]:
+    async def get_group(self, group_id: str) -> Group:
         """获取群组信息"""
         return await self._make_request(f"groups/{group_id}")
     
-    async def get_world(self, world_id: str) -> Union[Dict, str]:
+    async def get_world(self, world_id: str) -> World:
         """获取世界信息"""
         return await self._make_request(f"worlds/{world_id}")
     
-    async def get_user_groups(self, user_id: str) -> Union[Dict, str]:
+    async def get_user_groups(self, user_id: str) -> List[UserGroup]:
         """获取用户所属群组列表"""
         return await self._make_request(f"users/{user_id}/groups")
     
-    async def get_user_current_group(self, user_id: str) -> Union[Dict, str]:
+    async def get_user_current_group(self, user_id: str) -> UserGroup:
         """获取用户当前代表的群组"""
         return await self._make_request(f"users/{user_id}/groups/represented")
     
-    async def get_file_info(self, file_id: str) -> Union[Dict, str]:
+    async def get_file_info(self, file_id: str) -> FileInfo:
         """获取文件信息"""
         return await self._make_request(f"file/{file_id}")
     
-    async def get_friends(self, friends_status: bool, number: int) -> Union[Dict, str]:
-        """获取好友列表"""
-        return await self._make_request(f"auth/user/friends?offset=0&n={number}&offline={friends_status}")
\ No newline at end of file
+    async def get_file_meta(self, file_id: str, version: int) -> FileMeta:
+        """
+        获取文件某个版本的名称、上传者和大小
+        
+        说明:
+            已发布的文件版本不会变化，首次请求后按 (file_id, version) 永久保存，
+            之后不再请求VRChat。
+        
+        Raises:
+            VRChatNotFoundError: 文件或该版本不存在（版本尚未上传完成时也视为不存在）
+        """
+        store_key = self._cache_key(file_id)
+        meta = await self._files.get(store_key, version)
+        if meta is not None:
+            return meta
+        metas = metas_from_file_info(await self.get_file_info(file_id))
+        await self._files.add(store_key, metas)
+        if version not in metas:
+            raise VRChatNotFoundError(f"{NOT_FOUND_PREFIX}: file/{file_id}/{version}")
+        return metas[version]
+    
+    async def get_instance(self, location: str) -> Instance:
+        """获取实例信息（人数等），location 为 worldId:instanceId"""
+        return await self._make_request(f"instances/{location}")
+    
+    async def get_friends_page(self, offset: int, n: int, offline: bool = False) -> List[Friend]:
+        """获取一页好友列表（n 最大为 100）"""
+        return await self._make_request(
+            "auth/user/friends",
+            params={"offset": offset, "n": n, "offline": "true" if offline else "false"},
+        )
+    
+    def iter_friends(
+        self,
+        offline: bool = False,
+        limit: Optional[int] = None,
+        page_size: int = FRIENDS_PAGE_SIZE,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[Friend]:
+        """
+        分页遍历好友列表
+        
+        说明:
+            每轮并发请求 concurrency 页，哪一页先返回就先产出哪一页的好友，
+            某一页不足 page_size 条时说明已到末尾。
+        
+        Args:
+            offline: 为 True 时只返回离线好友，否则只返回在线好友（由服务端过滤）
+            limit: 最多返回的好友数，None 表示全部
+            page_size: 每页数量，不超过 100
+            concurrency: 每轮并发的页数，默认使用配置项 VRC_FRIENDS_CONCURRENCY
+            
+        Raises:
+            VRChatAPIError: 任意一页请求失败
+        """
+        page_size = min(page_size, FRIENDS_PAGE_SIZE)
+        return self._iter_pages(
+            lambda offset, n: self.get_friends_page(offset, n, offline),
+            limit,
+            page_size,
+            concurrency or settings.vrc_friends_concurrency,
+        )
+    
+    @staticmethod
+    async def _iter_pages(
+        fetch_page: Callable[[int, int], Awaitable[List[Any]]],
+        limit: Optional[int],
+        page_size: int,
+        concurrency: int,
+    ) -> AsyncIterator[Any]:
+        """
+        按 offset/n 分页并发遍历
+        
+        说明:
+            每轮并发请求 concurrency 页，哪一页先返回就先产出哪一页，
+            某一页不足 page_size 条时说明已到末尾；提前结束时取消还未完成的页。
+        """
+        offset = 0
+        yielded = 0
+        while limit is None or yielded < limit:
+            pages = concurrency
+            if limit is not None:
+                pages = min(pages, -(-(limit - yielded) // page_size))
+            tasks = [
+                asyncio.ensure_future(fetch_page(offset + i * page_size, page_size))
+                for i in range(pages)
+            ]
+            offset += pages * page_size
+            finished = False
+            try:
+                for future in asyncio.as_completed(tasks):
+                    page = await future
+                    if len(page) < page_size:
+                        finished = True
+                    for item in page:
+                        yield item
+                        yielded += 1
+                        if limit is not None and yielded >= limit:
+                            return
+            finally:
+                for task in tasks:
+                    task.cancel()
+            if finished:
+                return
+    
+    async def get_group_roles(self, group_id: str) -> List[GroupRole]:
+        """获取群组的身份组列表"""
+        return await self._make_request(f"groups/{group_id}/roles")
+    
+    async def get_group_members_page(self, group_id: str, offset: int, n: int) -> List[GroupMember]:
+        """获取一页群组成员（n 最大为 100，按加入时间排序）"""
+        return await self._make_request(
+            f"groups/{group_id}/members",
+            params={"offset": offset, "n": n, "sort": "joinedAt:asc"},
+        )
+    
+    def iter_group_members(
+        self,
+        group_id: str,
+        limit: Optional[int] = None,
+        concurrency: Optional[int] = None,
+    ) -> AsyncIterator[GroupMember]:
+        """
+        分页遍历群组成员，各页并发请求，返回顺序不保证与加入顺序一致
+        
+        Args:
+            group_id: 群组id
+            limit: 最多返回的成员数，None 表示全部
+            concurrency: 每轮并发的页数，默认使用配置项 VRC_GROUP_MEMBERS_CONCURRENCY
+            
+        Raises:
+            VRChatAPIError: 任意一页请求失败
+        """
+        return self._iter_pages(
+            lambda offset, n: self.get_group_members_page(group_id, offset, n),
+            limit,
+            GROUP_MEMBERS_PAGE_SIZE,
+            concurrency or settings.vrc_group_members_concurrency,
+        )
+    
+    def peek_user(self, user_id: str) -> Optional[User]:
+        """只从内存缓存中获取用户（可能已过期），不发送请求"""
+        return self._cache.peek(self._cache_key(f"users/{user_id}"))
+    
+    async def get_friends(self, friends_status: bool, number: int) -> List[Friend]:
+        """
+        获取好友列表，friends_status 为 True 时获取离线好友
+        
+        Raises:
+            VRChatAPIError: 任意一页请求失败
+        """
+        return [friend async for friend in self.iter_friends(offline=friends_status, limit=number)]
\ No newline at end of file